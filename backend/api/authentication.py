@@ -0,0 +1,105 @@
+"""
+Token authentication with cached users.
+"""
+
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+
+from recipes.versions import auth_version, get_version, versions_shared
+
+
+def token_cache_key(key):
+    """Tokens are never stored in the cache as is."""
+
+    return "auth:token:" + hashlib.sha256(key.encode()).hexdigest()
+
+
+class TokenCache:
+    """In-process LRU cache of (user, version) by token with TTL."""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, cache_key):
+        with self.lock:
+            entry = self.entries.get(cache_key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self.entries[cache_key]
+                return None
+            self.entries.move_to_end(cache_key)
+            return entry[1]
+
+    def set(self, cache_key, value):
+        with self.lock:
+            self.entries[cache_key] = (
+                time.monotonic() + settings.TOKEN_CACHE_TTL, value
+            )
+            self.entries.move_to_end(cache_key)
+            while len(self.entries) > settings.TOKEN_CACHE_SIZE:
+                self.entries.popitem(last=False)
+
+    def delete(self, cache_key):
+        with self.lock:
+            self.entries.pop(cache_key, None)
+
+
+TOKENS = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that does not query the database on every
+    request.
+
+    Users are cached by token in process for TOKEN_CACHE_TTL seconds and,
+    with TOKEN_CACHE_SHARED, in the shared cache. Every cached user is
+    stored with the version of user credentials, which is bumped on
+    logout, password change and deactivation, so stale entries are never
+    used. A hit costs one cache read instead of the database query.
+
+    Versions must be seen by all processes, so users are cached only
+    with a shared cache backend (e.g. Redis). With a process-local
+    backend every request is authenticated by the database: a token
+    revoked in one worker would still work in others until the TTL.
+    """
+
+    def authenticate_credentials(self, key):
+        if not versions_shared():
+            return super().authenticate_credentials(key)
+        cache_key = token_cache_key(key)
+        entry = TOKENS.get(cache_key)
+        if entry is None and settings.TOKEN_CACHE_SHARED:
+            entry = cache.get(cache_key)
+            if entry is not None:
+                TOKENS.set(cache_key, entry)
+        if entry is not None:
+            user, version = entry
+            if version == get_version(auth_version(user.pk)):
+                user = copy.copy(user)
+                return user, self.get_model()(key=key, user=user)
+            TOKENS.delete(cache_key)
+
+        user_id = self.get_model().objects.filter(key=key).values_list(
+            "user", flat=True
+        ).first()
+        if user_id is None:
+            return super().authenticate_credentials(key)
+        # The version is read before the user, so the entry becomes stale
+        # with any change committed after the user is read.
+        version = get_version(auth_version(user_id))
+        user, token = super().authenticate_credentials(key)
+        entry = (user, version)
+        TOKENS.set(cache_key, entry)
+        if settings.TOKEN_CACHE_SHARED:
+            cache.set(cache_key, entry, settings.TOKEN_CACHE_TTL)
+        return copy.copy(user), token
@@ -0,0 +1,139 @@
+"""
+In-process autocomplete of ingredients by name.
+
+Index is built in every worker on first use and is rebuilt when the
+ingredients catalog file is replaced (see recipes/catalogs.py) or when it is
+older than INGREDIENTS_INDEX_TTL seconds, so popularity of ingredients
+stays fresh too.
+"""
+
+import heapq
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+from django.db.models import Count
+
+from recipes import catalogs, models
+
+NGRAM = 3
+
+
+def ngrams(text):
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+# Built index, it is never changed and is replaced as a whole.
+Snapshot = namedtuple(
+    "Snapshot",
+    ("items", "names", "sorted_names", "postings", "stamp", "loaded_at"),
+)
+
+
+class IngredientIndex:
+    """
+    Case-folded index of ingredient names.
+
+    Prefix matches are found by binary search in sorted names, infix
+    matches by intersection of trigram postings. Matches are ranked by
+    usage in recipes. Readers do not lock: the index is rebuilt aside
+    and published by one assignment of "snapshot".
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.lock = threading.Lock()
+        self.snapshot = None
+
+    def is_fresh(self, snapshot):
+        return (
+            snapshot is not None
+            and snapshot.stamp == self.catalog.stamp()
+            and time.monotonic() - snapshot.loaded_at
+            < settings.INGREDIENTS_INDEX_TTL
+        )
+
+    def load(self):
+        """Builds index from the database and publishes it."""
+
+        stamp = self.catalog.stamp()
+        usage = dict(
+            models.RecipeIngredient.objects.values_list(
+                "ingredient"
+            ).annotate(Count("id")).order_by()
+        )
+        items = [
+            {"id": id, "name": name, "measurement_unit": unit}
+            for id, name, unit in models.Ingredient.objects.values_list(
+                "id", "name", "measurement_unit"
+            ).order_by("name")
+        ]
+        # Position in the list is used as a rank: popular ones go first.
+        items.sort(key=lambda item: -usage.get(item["id"], 0))
+        names = [item["name"].casefold() for item in items]
+        postings = defaultdict(set)
+        for rank, name in enumerate(names):
+            for gram in ngrams(name):
+                postings[gram].add(rank)
+
+        self.snapshot = Snapshot(
+            items=items,
+            names=names,
+            sorted_names=sorted(
+                (name, rank) for rank, name in enumerate(names)
+            ),
+            postings=dict(postings),
+            stamp=stamp,
+            loaded_at=time.monotonic(),
+        )
+        return self.snapshot
+
+    def refresh(self):
+        """Returns fresh snapshot, builds it if needed."""
+
+        snapshot = self.snapshot
+        if not self.is_fresh(snapshot):
+            with self.lock:
+                snapshot = self.snapshot
+                if not self.is_fresh(snapshot):
+                    snapshot = self.load()
+        return snapshot
+
+    def search(self, query, limit=None):
+        """
+        Returns ingredients that contain query, ones that start with query
+        go first. All matches are returned unless "limit" is given: the
+        catalog is small and the client filters it further while typing.
+        """
+
+        index = self.refresh()
+        limit = limit or len(index.names)
+        query = query.casefold()
+
+        prefixed = []
+        position = bisect_left(index.sorted_names, (query,))
+        while (position < len(index.sorted_names)
+               and index.sorted_names[position][0].startswith(query)):
+            prefixed.append(index.sorted_names[position][1])
+            position += 1
+        ranks = heapq.nsmallest(limit, prefixed)
+
+        if len(ranks) < limit:
+            if len(query) < NGRAM:
+                candidates = range(len(index.names))
+            else:
+                candidates = set.intersection(
+                    *(index.postings.get(gram, set())
+                      for gram in ngrams(query))
+                )
+            prefixed = set(prefixed)
+            ranks += heapq.nsmallest(limit - len(ranks), (
+                rank for rank in candidates
+                if rank not in prefixed and query in index.names[rank]
+            ))
+        return [index.items[rank] for rank in ranks]
+
+
+INGREDIENTS = IngredientIndex(catalogs.INGREDIENTS)
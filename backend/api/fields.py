@@ -0,0 +1,108 @@
+"""
+Custom serializer fields.
+"""
+
+import base64
+import binascii
+import tempfile
+import uuid
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from drf_extra_fields.fields import Base64FieldMixin, Base64ImageField
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+
+class RecipeImageField(Base64ImageField):
+    """
+    Image as base64 string or as uploaded file.
+
+    Base64 is decoded by chunks into a temporary file that is kept in
+    memory up to FILE_UPLOAD_MAX_MEMORY_SIZE. Size of the image is limited
+    by IMAGE_MAX_UPLOAD_SIZE, number of pixels by IMAGE_MAX_PIXELS, it is
+    checked by the header before the image is decoded.
+    """
+
+    def get_value(self, dictionary):
+        """
+        Files of multipart requests are merged by DRF into dict data as
+        lists of values.
+        """
+
+        value = super().get_value(dictionary)
+        if isinstance(value, list) and len(value) == 1:
+            return value[0]
+        return value
+
+    def to_internal_value(self, data):
+        if data in self.EMPTY_VALUES:
+            return None
+        if isinstance(data, str):
+            data = self.decode(data)
+        elif not isinstance(data, UploadedFile):
+            raise ValidationError(self.INVALID_FILE_MESSAGE)
+        if data.size > settings.IMAGE_MAX_UPLOAD_SIZE:
+            raise ValidationError(settings.IMAGE_SIZE_ERROR)
+        self.check_pixels(data)
+        return super(Base64FieldMixin, self).to_internal_value(data)
+
+    def decode(self, data):
+        content_type = None
+        if ";base64," in data:
+            header, data = data.split(";base64,", 1)
+            if self.trust_provided_content_type:
+                content_type = header.replace("data:", "")
+        # Encoders may wrap lines, chunks must stay aligned to 4 chars.
+        data = "".join(data.split())
+        if len(data) > (settings.IMAGE_MAX_UPLOAD_SIZE + 2) // 3 * 4:
+            raise ValidationError(settings.IMAGE_SIZE_ERROR)
+
+        file = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        chunk_size = settings.IMAGE_DECODE_CHUNK_SIZE // 4 * 4
+        try:
+            for start in range(0, len(data), chunk_size):
+                file.write(base64.b64decode(
+                    data[start:start + chunk_size], validate=True
+                ))
+        except (binascii.Error, ValueError):
+            file.close()
+            raise ValidationError(self.INVALID_FILE_MESSAGE)
+        size = file.tell()
+        file.seek(0)
+
+        extension = self.get_extension(file)
+        return UploadedFile(
+            file=file,
+            name=f"{uuid.uuid4()}.{extension}",
+            content_type=content_type,
+            size=size,
+        )
+
+    def get_extension(self, file):
+        try:
+            with Image.open(file) as image:
+                extension = (image.format or "").lower()
+        except (OSError, Image.DecompressionBombError):
+            raise ValidationError(self.INVALID_FILE_MESSAGE)
+        finally:
+            file.seek(0)
+        extension = "jpg" if extension == "jpeg" else extension
+        if extension not in self.ALLOWED_TYPES:
+            raise ValidationError(self.INVALID_TYPE_MESSAGE)
+        return extension
+
+    def check_pixels(self, file):
+        """Reads only the header of the image."""
+
+        try:
+            with Image.open(file) as image:
+                width, height = image.size
+        except (OSError, Image.DecompressionBombError):
+            raise ValidationError(self.INVALID_FILE_MESSAGE)
+        finally:
+            file.seek(0)
+        if width * height > settings.IMAGE_MAX_PIXELS:
+            raise ValidationError(settings.IMAGE_PIXELS_ERROR)
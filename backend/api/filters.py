@@ -2,10 +2,10 @@
 Filters for views.
 """
 
-from django.db.models import BooleanField, ExpressionWrapper, Q
 from django_filters.rest_framework import FilterSet, filters
 
 from recipes.models import Ingredient, Recipe, Tag
+from recipes.search import search
 
 
 class RecipeFilter(FilterSet):
@@ -22,6 +22,9 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method="is_in_shopping_cart_filter"
     )
+    search = filters.CharFilter(
+        method="search_filter"
+    )
 
     class Meta:
         model = Recipe
@@ -29,7 +32,8 @@ class RecipeFilter(FilterSet):
             "tags",
             "author",
             "is_favorited",
-            "is_in_shopping_cart",)
+            "is_in_shopping_cart",
+            "search",)
 
     def is_favorite_filter(self, queryset, name, value):
         user = self.request.user
@@ -43,24 +47,25 @@ class RecipeFilter(FilterSet):
             return queryset.filter(shopping_cart__user=user)
         return queryset
 
+    def search_filter(self, queryset, name, value):
+        """Full-text search, the most relevant recipes go first."""
+
+        if not value.strip():
+            return queryset
+        return search(queryset, value)
+
 
 class IngredientFilter(FilterSet):
-    """Filter for ingredients by name."""
+    """
+    Filter for ingredients by name.
 
-    name = filters.CharFilter(method="filter_name")
+    It describes the parameter for the browsable API and schema: "list"
+    requests with name are answered from autocomplete index (see
+    AutocompleteMixin) and do not reach the database.
+    """
+
+    name = filters.CharFilter(lookup_expr="icontains")
 
     class Meta:
         model = Ingredient
         fields = ("name",)
-
-    def filter_name(self, queryset, name, value):
-        """Returns queryset with selected name."""
-
-        return queryset.filter(
-            Q(name__istartswith=value) | Q(name__icontains=value)
-        ).annotate(
-            startswith=ExpressionWrapper(
-                Q(name__istartswith=value),
-                output_field=BooleanField()
-            )
-        ).order_by("-startswith")
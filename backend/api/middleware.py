@@ -0,0 +1,148 @@
+"""
+Per-request profiling of queries, serialization and rendering.
+
+Switched on by QUERY_PROFILING setting, otherwise the middleware is
+removed from the chain on startup and costs nothing. Numbers are sent
+in "Server-Timing" header, serialization time includes queries made by
+serializers. Identical SQL repeated from the same line of project code
+QUERY_REPEAT_THRESHOLD times or more is logged as a likely N+1.
+"""
+
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger(__name__)
+
+_profile = ContextVar("profile", default=None)
+
+
+def call_site(project_dir):
+    """The nearest frame of project code outside of this module."""
+
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(project_dir) and filename != __file__
+                and "site-packages" not in filename):
+            return (f"{os.path.relpath(filename, project_dir)}:"
+                    f"{frame.f_lineno} in {frame.f_code.co_name}")
+        frame = frame.f_back
+    return None
+
+
+class Profile:
+    """Numbers of one request, times are in seconds."""
+
+    def __init__(self, project_dir):
+        self.project_dir = project_dir
+        self.queries = 0
+        self.db_time = 0
+        self.serializer_time = 0
+        self.serializer_depth = 0
+        self.render_time = 0
+        self.render_start = None
+        self.shapes = Counter()
+
+    def execute(self, execute, sql, params, many, context):
+        self.shapes[sql, call_site(self.project_dir)] += 1
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - start
+
+    def repeated(self):
+        """Returns [(sql, call site, count)] of likely N+1 queries."""
+
+        return [
+            (sql, site, count)
+            for (sql, site), count in self.shapes.most_common()
+            if site is not None
+            and count >= settings.QUERY_REPEAT_THRESHOLD
+        ]
+
+    def rendered(self, response):
+        self.render_time = time.perf_counter() - self.render_start
+
+
+def profiled_data(data):
+    """Measures the outermost serialization of request."""
+
+    def wrapper(serializer):
+        profile = _profile.get()
+        if profile is None:
+            return data.fget(serializer)
+        profile.serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return data.fget(serializer)
+        finally:
+            profile.serializer_depth -= 1
+            if not profile.serializer_depth:
+                profile.serializer_time += time.perf_counter() - start
+
+    wrapper.profiled = True
+    return property(wrapper)
+
+
+class QueryProfilingMiddleware:
+    """Adds "Server-Timing" header and logs likely N+1 queries."""
+
+    def __init__(self, get_response):
+        if not settings.QUERY_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.project_dir = str(settings.BASE_DIR) + os.sep
+        if not getattr(BaseSerializer.data.fget, "profiled", False):
+            BaseSerializer.data = profiled_data(BaseSerializer.data)
+
+    def __call__(self, request):
+        profile = Profile(self.project_dir)
+        token = _profile.set(profile)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(profile.execute)
+                    )
+                response = self.get_response(request)
+        finally:
+            _profile.reset(token)
+        total = time.perf_counter() - start
+
+        metrics = [
+            f'db;dur={profile.db_time * 1000:.1f};'
+            f'desc="{profile.queries} queries"',
+            f"serialize;dur={profile.serializer_time * 1000:.1f}",
+            f"render;dur={profile.render_time * 1000:.1f}",
+            f"total;dur={total * 1000:.1f}",
+        ]
+        repeated = profile.repeated()
+        if repeated:
+            metrics.append(f'nplusone;desc="{len(repeated)} repeated"')
+            for sql, site, count in repeated:
+                logger.warning(
+                    "Likely N+1 in %s %s: %s queries from %s: %s",
+                    request.method, request.path, count, site, sql,
+                )
+        response["Server-Timing"] = ", ".join(metrics)
+        return response
+
+    def process_template_response(self, request, response):
+        profile = _profile.get()
+        if profile is not None:
+            profile.render_start = time.perf_counter()
+            response.add_post_render_callback(profile.rendered)
+        return response
@@ -0,0 +1,174 @@
+"""
+Mixins for viewsets.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import FileResponse
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from recipes.versions import (CATALOG_VERSION, counters_stamp, get_stamps,
+                              get_version, user_version, versions_shared)
+
+
+def request_fingerprint(request):
+    """Hash of url and normalized query parameters of request."""
+
+    query = sorted(
+        (key, sorted(values))
+        for key, values in request.query_params.lists()
+    )
+    return hashlib.md5(
+        f"{request.build_absolute_uri(request.path)}?{query}".encode()
+    ).hexdigest()
+
+
+class AnonymousCacheMixin:
+    """
+    Caches "list" and "retrieve" responses for anonymous users.
+
+    Responses are identical for all anonymous users, so they are cached
+    by url and normalized query parameters. Key also contains version of
+    the data ("cache_version"), bumping the version invalidates all
+    cached responses. If "shows_counters" is set, key contains the stamp
+    of counters too. Nothing is cached with a process-local cache
+    backend: other workers would not see bumped versions.
+    """
+
+    cache_version = CATALOG_VERSION
+    cache_timeout = settings.RESPONSE_CACHE_TIMEOUT
+    shows_counters = False
+
+    def get_cache_key(self, request):
+        counters = counters_stamp()[0] if self.shows_counters else ""
+        return (f"{self.cache_version}:{get_version(self.cache_version)}:"
+                f"{counters}:{self.action}:{request_fingerprint(request)}")
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if not request.user.is_anonymous or not versions_shared():
+            return handler(request, *args, **kwargs)
+
+        key = self.get_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, self.cache_timeout)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class ConditionalGetMixin:
+    """
+    Adds ETag and Last-Modified to "list" and "retrieve" responses and
+    answers 304 if they are not changed.
+
+    Validators are built from versions of the data ("etag_versions"),
+    the request and the current user, so they are checked before any
+    query or serialization. If "per_user" is set, version of favorites,
+    shopping cart and subscriptions of current user is added. If
+    "shows_counters" is set, the stamp of counters is added. Validators
+    are not sent with a process-local cache backend: 304 would be
+    answered by stale versions of a worker.
+    """
+
+    etag_versions = ()
+    per_user = False
+    shows_counters = False
+
+    def get_etag_versions(self, request):
+        versions = list(self.etag_versions)
+        if self.per_user and request.user.is_authenticated:
+            versions.append(user_version(request.user.id))
+        return versions
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD") or not versions_shared():
+            return handler(request, *args, **kwargs)
+
+        stamps = get_stamps(self.get_etag_versions(request))
+        if self.shows_counters:
+            stamps.append(counters_stamp())
+        etag = quote_etag(hashlib.md5(
+            f"{request_fingerprint(request)}:{request.user.id}:{stamps}"
+            .encode()
+        ).hexdigest())
+        last_modified = int(max(modified for _, modified in stamps))
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if status.is_success(response.status_code):
+                response.headers.setdefault("ETag", etag)
+                response.headers.setdefault(
+                    "Last-Modified", http_date(last_modified)
+                )
+        patch_cache_control(response, no_cache=True)
+        if self.per_user:
+            patch_cache_control(response, private=True)
+            patch_vary_headers(response, ("Authorization",))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class CatalogMixin:
+    """
+    Answers unfiltered "list" requests with pre-rendered catalog.
+
+    Catalog is sent only for JSON format, other formats (e.g. browsable
+    API) are rendered as usual.
+    """
+
+    catalog = None
+
+    def list(self, request, *args, **kwargs):
+        if (request.query_params
+                or request.accepted_renderer.format != "json"):
+            return super().list(request, *args, **kwargs)
+        return FileResponse(
+            self.catalog.open(), content_type="application/json"
+        )
+
+
+class AutocompleteMixin:
+    """
+    Answers "list" requests with "search_param" from in-process index
+    ("search_index") in every format, without queries and serialization.
+    All matches are returned. Empty query is answered as usual with the
+    full list.
+    """
+
+    search_index = None
+    search_param = "name"
+
+    def list(self, request, *args, **kwargs):
+        query = request.query_params.get(self.search_param)
+        if not query:
+            return super().list(request, *args, **kwargs)
+        return Response(self.search_index.search(query))
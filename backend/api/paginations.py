@@ -2,8 +2,187 @@
 Custom pagination.
 """
 
-from rest_framework.pagination import PageNumberPagination
+import json
+from datetime import date
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import (Cursor, CursorPagination,
+                                       PageNumberPagination)
+
+from recipes.pagination import EstimatedCountPaginator
 
 
 class CustomPagination(PageNumberPagination):
     page_size_query_param = "limit"
+    max_page_size = settings.MAX_PAGE_SIZE
+    django_paginator_class = EstimatedCountPaginator
+
+
+def seek(ordering, values):
+    """
+    Condition of rows that go after the row with "values" of "ordering"
+    fields: (a, b) > (x, y) is a > x or a = x and b > y. The range of the
+    first field is added, so its index limits the scan.
+    """
+
+    condition = None
+    for field, value in reversed(list(zip(ordering, values))):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        after = Q(**{f"{name}__{lookup}": value})
+        condition = after if condition is None else (
+            after | (Q(**{name: value}) & condition)
+        )
+    first = ordering[0]
+    bound = "lte" if first.startswith("-") else "gte"
+    return Q(**{f"{first.lstrip('-')}__{bound}": values[0]}) & condition
+
+
+def reverse_ordering(ordering):
+    return tuple(
+        field[1:] if field.startswith("-") else f"-{field}"
+        for field in ordering
+    )
+
+
+class FeedCursorPagination(CursorPagination):
+    """
+    Keyset pagination for feeds.
+
+    Seeks on all fields of "ordering" together, the last one must be
+    unique. Position in the cursor is JSON list of values of the fields,
+    it is unique, so cursors never have an offset.
+    """
+
+    page_size = settings.OBJECTS_PER_PAGE
+    page_size_query_param = "limit"
+    max_page_size = settings.MAX_PAGE_SIZE
+    ordering = ("-pub_date", "-id")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse, position = (
+            (False, None) if self.cursor is None
+            else (self.cursor.reverse, self.cursor.position)
+        )
+
+        ordering = reverse_ordering(self.ordering) if reverse else (
+            self.ordering
+        )
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(
+                    seek(ordering, self.decode_position(position))
+                )
+            except DjangoValidationError:
+                raise NotFound(self.invalid_cursor_message)
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.previous_position = self.next_position = position
+        if self.page:
+            self.previous_position = self._get_position_from_instance(
+                self.page[0], self.ordering
+            )
+            self.next_position = self._get_position_from_instance(
+                self.page[-1], self.ordering
+            )
+        if (self.has_previous or self.has_next) and self.template:
+            self.display_page_controls = True
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=self.next_position)
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=self.previous_position)
+        )
+
+    def decode_position(self, position):
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(
+            self.ordering
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def _get_position_from_instance(self, instance, ordering):
+        """Dates keep microseconds, unlike in DjangoJSONEncoder."""
+
+        values = []
+        for field in ordering:
+            name = field.lstrip("-")
+            value = (instance[name] if isinstance(instance, dict)
+                     else getattr(instance, name))
+            if isinstance(value, date):
+                value = value.isoformat()
+            values.append(value)
+        return json.dumps(values, separators=(",", ":"))
+
+
+class SubscriptionCursorPagination(FeedCursorPagination):
+    ordering = ("-subscription_date", "-id")
+
+
+class FeedPagination(CustomPagination):
+    """
+    Page number pagination with opt-in cursor mode.
+
+    Cursor mode is switched on by "cursor" query parameter, the first
+    page is requested with an empty value: "?cursor=". It is rejected
+    together with any of "ranking_query_params": cursor seeks on the
+    fixed ordering and would drop the ordering by relevance.
+    """
+
+    cursor_query_param = "cursor"
+    cursor_pagination_class = FeedCursorPagination
+    ranking_query_params = ("search",)
+
+    def __init__(self):
+        self.cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param in params:
+            if any(params.get(param, "").strip()
+                   for param in self.ranking_query_params):
+                raise ValidationError(
+                    {self.cursor_query_param: settings.CURSOR_SEARCH_ERROR}
+                )
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class SubscriptionPagination(FeedPagination):
+    cursor_pagination_class = SubscriptionCursorPagination
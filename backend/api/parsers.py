@@ -0,0 +1,81 @@
+"""
+Parsers with bounded memory.
+"""
+
+import io
+import json
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework.parsers import DataAndFiles, JSONParser, MultiPartParser
+
+
+class PayloadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = settings.BODY_SIZE_ERROR
+    default_code = "payload_too_large"
+
+
+def content_length(request):
+    try:
+        return int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        return 0
+
+
+class BoundedJSONParser(JSONParser):
+    """
+    JSON parser that refuses bodies larger than JSON_MAX_BODY_SIZE before
+    reading them. Bodies without Content-Length are read up to the limit.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        limit = settings.JSON_MAX_BODY_SIZE
+        request = (parser_context or {}).get("request")
+        if request is not None and content_length(request) > limit:
+            raise PayloadTooLarge()
+        body = stream.read(limit + 1) if stream is not None else b""
+        if len(body) > limit:
+            raise PayloadTooLarge()
+        return super().parse(io.BytesIO(body), media_type, parser_context)
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """Spools uploaded files to disk, stops uploads above the size cap."""
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.IMAGE_MAX_UPLOAD_SIZE:
+            raise PayloadTooLarge()
+        return super().receive_data_chunk(raw_data, start)
+
+
+class RecipeMultiPartParser(MultiPartParser):
+    """
+    Multipart alternative of JSON body for recipes.
+
+    Part "data" holds JSON object with all fields except image, part
+    "image" holds the file. Files are written to temporary files on disk
+    instead of memory.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context["request"]
+        limit = settings.IMAGE_MAX_UPLOAD_SIZE + settings.JSON_MAX_BODY_SIZE
+        if content_length(request) > limit:
+            raise PayloadTooLarge()
+        request._request.upload_handlers = [
+            ImageUploadHandler(request._request)
+        ]
+        parsed = super().parse(stream, media_type, parser_context)
+        data = parsed.data.get("data")
+        if data is None:
+            return parsed
+        try:
+            data = json.loads(data)
+        except ValueError as error:
+            raise ParseError(f"JSON parse error - {error}")
+        if not isinstance(data, dict):
+            raise ParseError("Part \"data\" must be JSON object.")
+        return DataAndFiles(data, parsed.files)
@@ -0,0 +1,165 @@
+"""
+Renderers of shopping list.
+
+Every renderer can render the list as a stream of bytes chunks from
+iterable of rows (name, amount, measurement_unit), so the list is never
+held in memory as a whole. Method "render" is used for error responses
+only.
+"""
+
+import csv
+import io
+import json
+import os
+
+from django.conf import settings
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import BaseRenderer
+
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen import canvas
+except ImportError:
+    canvas = None
+
+
+class FormatNegotiation(DefaultContentNegotiation):
+    """
+    Selects renderer by "format" query parameter only, the first renderer
+    is used by default.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        format = format_suffix or request.query_params.get(
+            self.settings.URL_FORMAT_OVERRIDE
+        )
+        if not format:
+            return renderers[0], renderers[0].media_type
+        return super().select_renderer(request, renderers, format_suffix)
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """Base renderer of shopping list."""
+
+    charset = "utf-8"
+    available = True
+
+    @property
+    def content_type(self):
+        if self.charset:
+            return f"{self.media_type}; charset={self.charset}"
+        return self.media_type
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Errors are JSON whatever format is negotiated."""
+
+        if data is None:
+            return b""
+        response = (renderer_context or {}).get("response")
+        if response is not None:
+            response["Content-Type"] = "application/json"
+        return json.dumps(data, ensure_ascii=False).encode()
+
+    def stream(self, rows):
+        raise NotImplementedError
+
+
+class TextRenderer(ShoppingListRenderer):
+    """Lines "name: amount measurement_unit"."""
+
+    media_type = "text/plain"
+    format = "txt"
+
+    def stream(self, rows):
+        separator = ""
+        for name, amount, measurement_unit in rows:
+            yield f"{separator}{name}: {amount} {measurement_unit}".encode()
+            separator = "\n"
+
+
+class CSVRenderer(ShoppingListRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+    def stream(self, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(("name", "amount", "measurement_unit"))
+        for row in rows:
+            writer.writerow(row)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue().encode()
+
+
+class JSONListRenderer(ShoppingListRenderer):
+    media_type = "application/json"
+    format = "json"
+    charset = None
+
+    def stream(self, rows):
+        separator = "["
+        for name, amount, measurement_unit in rows:
+            yield (separator + json.dumps({
+                "name": name,
+                "amount": amount,
+                "measurement_unit": measurement_unit,
+            }, ensure_ascii=False)).encode()
+            separator = ","
+        yield b"[]" if separator == "[" else b"]"
+
+
+class PDFRenderer(ShoppingListRenderer):
+    """
+    Printable list. Needs reportlab, font is set by PDF_FONT setting (it
+    must have cyrillic glyphs).
+    """
+
+    media_type = "application/pdf"
+    format = "pdf"
+    charset = None
+    available = canvas is not None
+
+    font_size = 12
+    box_size = 10
+    margin = 50
+
+    def get_font(self):
+        if not os.path.exists(settings.PDF_FONT):
+            return "Helvetica"
+        if settings.PDF_FONT not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(TTFont(settings.PDF_FONT,
+                                           settings.PDF_FONT))
+        return settings.PDF_FONT
+
+    def stream(self, rows):
+        buffer = io.BytesIO()
+        document = canvas.Canvas(buffer, pagesize=A4)
+        width, height = A4
+        font = self.get_font()
+        line_height = self.font_size * 1.5
+        y = height - self.margin
+        document.setFont(font, self.font_size)
+        for name, amount, measurement_unit in rows:
+            if y < self.margin:
+                document.showPage()
+                document.setFont(font, self.font_size)
+                y = height - self.margin
+            document.rect(self.margin, y - 1, self.box_size, self.box_size)
+            document.drawString(
+                self.margin + self.box_size * 2, y,
+                f"{name}: {amount} {measurement_unit}"
+            )
+            y -= line_height
+        document.save()
+        yield buffer.getvalue()
+
+
+SHOPPING_LIST_RENDERERS = tuple(
+    renderer for renderer in (
+        TextRenderer, CSVRenderer, JSONListRenderer, PDFRenderer
+    ) if renderer.available
+)
@@ -4,24 +4,59 @@ Serializers.
 
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.db.models import F
 from django.db.transaction import atomic
-from drf_extra_fields.fields import Base64ImageField
-from rest_framework import serializers
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
 
-from recipes import models
+from recipes import cards, cart, images, models
 from users.models import Subscription, User
 
+from .fields import RecipeImageField
+
 # -----------------------------------------------------------------------------
 #                            Users app
 # -----------------------------------------------------------------------------
 
 
-class BaseRecipeSerializer(serializers.ModelSerializer):
+def get_recipe_limit(request):
+    """
+    Returns "recipe_limit" query parameter as a number or None. Raises
+    ValidationError (400) for anything but non-negative integer.
+    """
+
+    recipe_limit = request.query_params.get("recipe_limit")
+    if recipe_limit is None or recipe_limit == "":
+        return None
+    try:
+        recipe_limit = int(recipe_limit)
+    except ValueError:
+        recipe_limit = -1
+    if recipe_limit < 0:
+        raise serializers.ValidationError(
+            {"recipe_limit": settings.RECIPE_LIMIT_ERROR}
+        )
+    return recipe_limit
+
+
+class ImageVariantsMixin(serializers.Serializer):
+    """Resized copies of recipe image, empty until they are rendered."""
+
+    image_variants = serializers.SerializerMethodField(
+        method_name="get_image_variants"
+    )
+
+    def get_image_variants(self, object):
+        return images.urls(object.image_variants,
+                           self.context.get("request"))
+
+
+class BaseRecipeSerializer(ImageVariantsMixin, serializers.ModelSerializer):
     """Cut version of recipe serializer just for subscriptions."""
 
     class Meta:
         model = models.Recipe
-        fields = ("id", "name", "image", "cooking_time")
+        fields = ("id", "name", "image", "image_variants", "cooking_time")
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -40,10 +75,13 @@ class UserSerializer(serializers.ModelSerializer):
             "first_name",
             "last_name",
             "is_subscribed",
+            "recipes_count",
+            "followers_count",
             "password",
         )
         extra_kwargs = {"password": {"write_only": True}}
-        read_only_fields = "is_subscribed",
+        read_only_fields = ("is_subscribed", "recipes_count",
+                            "followers_count")
 
     def get_is_subscribed(self, object):
         """User subscription check."""
@@ -51,6 +89,8 @@ class UserSerializer(serializers.ModelSerializer):
         user = self.context.get("request").user
         if user.is_anonymous:
             return False
+        if hasattr(object, "is_subscribed"):
+            return object.is_subscribed
         return Subscription.objects.filter(
             user=user,
             author=object.id
@@ -81,13 +121,9 @@ class SubscribeSerializer(UserSerializer):
     recipes = serializers.SerializerMethodField(
         method_name="get_recipes"
     )
-    recipes_count = serializers.SerializerMethodField(
-        method_name="get_recipes_count"
-    )
 
     class Meta(UserSerializer.Meta):
-        fields = (UserSerializer.Meta.fields
-                  + ("recipes", "recipes_count"))
+        fields = UserSerializer.Meta.fields + ("recipes",)
 
     def get_is_subscribed(*args):
         """
@@ -98,21 +134,22 @@ class SubscribeSerializer(UserSerializer):
         return True
 
     def get_recipes(self, object):
-        """Get recipes queryset."""
+        """
+        Get recipes queryset. Recipes are taken from "recipe_previews"
+        attribute if they are loaded by view.
+        """
 
         request = self.context.get("request")
         context = {"request": request}
-        recipe_limit = request.query_params.get("recipe_limit")
-        queryset = object.recipes.all()
-        if recipe_limit:
-            queryset = queryset[:int(recipe_limit)]
+        if hasattr(object, "recipe_previews"):
+            queryset = object.recipe_previews
+        else:
+            recipe_limit = get_recipe_limit(request)
+            queryset = object.recipes.all()
+            if recipe_limit is not None:
+                queryset = queryset[:recipe_limit]
         return BaseRecipeSerializer(queryset, context=context, many=True).data
 
-    def get_recipes_count(self, object):
-        """Count number of recipes"""
-
-        return object.recipes.count()
-
 # -----------------------------------------------------------------------------
 #                            Recipe app
 # -----------------------------------------------------------------------------
@@ -151,24 +188,62 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
 
 
 class AddIngredientSerializer(serializers.ModelSerializer):
-    """Serializer for adding an ingredient when creating a recipe."""
+    """
+    Serializer for adding an ingredient when creating a recipe.
+    Ingredients of the recipe are loaded by RecipeSerializer at once.
+    """
 
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=models.Ingredient.objects.all(),
-        source="ingredient"
-    )
+    id = serializers.IntegerField(min_value=1, source="ingredient")
 
     class Meta:
         model = models.RecipeIngredient
         fields = ("id", "amount")
 
 
+class RecipeListSerializer(serializers.ListSerializer):
+    """Builds missing cards of recipes in one batch."""
+
+    def to_representation(self, data):
+        recipes = list(data.all() if hasattr(data, "all") else data)
+        cards.fill(recipes)
+        return super().to_representation(recipes)
+
+
+def resolve_ids(model, ids):
+    """
+    Loads objects by ids with one query, keeping the order of ids.
+    All missing ids are reported in one error.
+    """
+
+    objects = model.objects.in_bulk(ids)
+    missing = [pk for pk in ids if pk not in objects]
+    if missing:
+        raise ValidationError(settings.NOT_FOUND_ERROR.format(
+            ids=", ".join(map(str, missing))
+        ))
+    return [objects[pk] for pk in ids]
+
+
+class VersionConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = settings.VERSION_ERROR
+    default_code = "version_conflict"
+
+
 class RecipeSerializer(serializers.ModelSerializer):
-    """Serializer for recipes."""
+    """
+    Serializer for recipes.
+
+    Partial update changes only sent fields, "ingredients" and "tags"
+    are replaced by sent lists. "version" of the recipe is optional, by
+    default it is the version of the loaded recipe.
+    """
 
     author = UserSerializer(read_only=True)
-    image = Base64ImageField()
+    image = RecipeImageField()
+    tags = serializers.ListField(child=serializers.IntegerField(min_value=1))
     ingredients = AddIngredientSerializer(many=True)
+    version = serializers.IntegerField(min_value=1, required=False)
 
     class Meta:
         model = models.Recipe
@@ -180,27 +255,39 @@ class RecipeSerializer(serializers.ModelSerializer):
             "name",
             "image",
             "text",
-            "cooking_time"
+            "cooking_time",
+            "version",
         )
+        list_serializer_class = RecipeListSerializer
 
-    def validate(self, data):
-        """Validation."""
+    def validate_ingredients(self, ingredients):
+        """Ids of ingredients are resolved by one query."""
 
-        cooking_time = data["cooking_time"]
-        tags = data["tags"]
-        ingredients = data["ingredients"]
         list_ing = []
-
         for ingredient in ingredients:
             if ingredient["amount"] < settings.MIN_AMOUNT_INGREDIENTS:
                 raise ValidationError(settings.AMOUNT_ERROR)
             list_ing.append(ingredient["ingredient"])
-
         if len(list_ing) == 0 or len(list_ing) != len(set(list_ing)):
             raise ValidationError(settings.INGREDIENTS_ERROR)
+        objects = resolve_ids(models.Ingredient, list_ing)
+        for ingredient, obj in zip(ingredients, objects):
+            ingredient["ingredient"] = obj
+        return ingredients
+
+    def validate_tags(self, tags):
+        """Ids of tags are resolved by one query."""
+
         if len(tags) == 0 or len(tags) != len(set(tags)):
             raise ValidationError(settings.TAGS_ERROR)
-        if cooking_time < settings.COOKING_TIME_MIN:
+        return resolve_ids(models.Tag, tags)
+
+    def validate(self, data):
+        """Validation, partial data is checked by sent fields."""
+
+        if data.get("cooking_time", settings.COOKING_TIME_MIN) < (
+            settings.COOKING_TIME_MIN
+        ):
             raise ValidationError(settings.COOKING_TIME_ERROR)
         return data
 
@@ -214,6 +301,54 @@ class RecipeSerializer(serializers.ModelSerializer):
                 amount=ingredient.get("amount")
             ) for ingredient in ingredients)
 
+    def diff_ingredients(self, recipe, ingredients):
+        """
+        Returns ids of removed rows, changed rows and new rows of
+        ingredients, nothing is written.
+        """
+
+        amounts = {
+            ingredient["ingredient"].id: ingredient["amount"]
+            for ingredient in ingredients
+        }
+        stored = {
+            row.ingredient_id: row
+            for row in models.RecipeIngredient.objects.filter(recipe=recipe)
+        }
+        removed = [
+            row.id for ingredient_id, row in stored.items()
+            if ingredient_id not in amounts
+        ]
+        changed = []
+        for ingredient_id, row in stored.items():
+            amount = amounts.get(ingredient_id, row.amount)
+            if row.amount != amount:
+                row.amount = amount
+                changed.append(row)
+        added = [
+            models.RecipeIngredient(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount
+            )
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in stored
+        ]
+        return removed, changed, added
+
+    def update_ingredients(self, recipe, diff):
+        """
+        Writes only added, changed and removed ingredients, shopping
+        carts with the recipe are updated.
+        """
+
+        removed, changed, added = diff
+        cart_users = cart.cart_users(recipe.id)
+        cart.remove_recipe(recipe.id, cart_users)
+        if removed:
+            models.RecipeIngredient.objects.filter(id__in=removed).delete()
+        models.RecipeIngredient.objects.bulk_update(changed, ("amount",))
+        models.RecipeIngredient.objects.bulk_create(added)
+        cart.add_recipe(recipe.id, cart_users)
+
     @atomic
     def create(self, validated_data):
         """Creation of recipe."""
@@ -221,26 +356,71 @@ class RecipeSerializer(serializers.ModelSerializer):
         user = self.context.get("request").user
         tags = validated_data.pop("tags")
         ingredients = validated_data.pop("ingredients")
+        validated_data.pop("version", None)
         recipe = models.Recipe.objects.create(author=user,
                                               **validated_data)
         recipe.tags.set(tags)
         self.get_ingredients(recipe, ingredients)
+        recipe.card = cards.rebuild([recipe.id])[recipe.id]
 
         return recipe
 
-    @atomic
-    def update(self, instance, validated_data):
-        """Update for recipe."""
+    def get_changes(self, instance, validated_data):
+        """
+        Returns new tags, diff of ingredients and names of changed
+        fields, tags and diff are None if they are not changed.
+        """
 
-        tags = validated_data.pop("tags")
-        ingredients = validated_data.pop("ingredients")
+        tags = validated_data.pop("tags", None)
+        ingredients = validated_data.pop("ingredients", None)
+        if tags is not None and {tag.id for tag in tags} == set(
+            instance.tags.values_list("id", flat=True)
+        ):
+            tags = None
+        diff = None
+        if ingredients is not None:
+            diff = self.diff_ingredients(instance, ingredients)
+            if not any(diff):
+                diff = None
+        changed = [
+            field for field, value in validated_data.items()
+            if getattr(instance, field) != value
+        ]
+        return tags, diff, changed
 
-        models.RecipeIngredient.objects.filter(recipe=instance).delete()
+    @atomic
+    def update(self, instance, validated_data):
+        """
+        Update for recipe, only changed fields and rows are written.
 
-        instance.tags.set(tags)
-        self.get_ingredients(instance, ingredients)
+        Version is checked and incremented by one UPDATE, so concurrent
+        update of the same version is rejected without SELECT FOR UPDATE.
+        Update that changes nothing keeps the version.
+        """
 
-        return super().update(instance, validated_data)
+        version = validated_data.pop("version", instance.version)
+        tags, diff, changed = self.get_changes(instance, validated_data)
+        if tags is None and diff is None and not changed:
+            if version != instance.version:
+                raise VersionConflict()
+            return instance
+        if not models.Recipe.objects.filter(
+            id=instance.id, version=version
+        ).update(version=F("version") + 1):
+            raise VersionConflict()
+        instance.version = version + 1
+
+        if tags is not None:
+            instance.tags.set(tags)
+        if diff is not None:
+            self.update_ingredients(instance, diff)
+        for field in changed:
+            setattr(instance, field, validated_data[field])
+        if changed:
+            instance.save(update_fields=changed)
+        instance.card = cards.rebuild([instance.id])[instance.id]
+
+        return instance
 
     def to_representation(self, instance):
         """Method for representation recipes."""
@@ -249,7 +429,7 @@ class RecipeSerializer(serializers.ModelSerializer):
         return GetRecipeSerializer(instance, context=context).data
 
 
-class GetRecipeSerializer(serializers.ModelSerializer):
+class GetRecipeSerializer(ImageVariantsMixin, serializers.ModelSerializer):
     """Serializer for full information about recipe."""
 
     tags = TagSerializer(many=True)
@@ -267,7 +447,10 @@ class GetRecipeSerializer(serializers.ModelSerializer):
         model = models.Recipe
         fields = ("id", "tags", "author", "ingredients",
                   "is_favorited", "is_in_shopping_cart",
-                  "name", "image", "text", "cooking_time")
+                  "favorites_count", "in_carts_count",
+                  "name", "image", "image_variants", "text", "cooking_time",
+                  "version")
+        list_serializer_class = RecipeListSerializer
 
     def get_is_favorited(self, object):
         """Method for getting favorited recipes."""
@@ -275,6 +458,8 @@ class GetRecipeSerializer(serializers.ModelSerializer):
         user = self.context.get("request").user
         if user.is_anonymous:
             return False
+        if hasattr(object, "is_favorited"):
+            return object.is_favorited
         return object.favorite.filter(user=user).exists()
 
     def get_is_in_shopping_cart(self, object):
@@ -283,8 +468,77 @@ class GetRecipeSerializer(serializers.ModelSerializer):
         user = self.context.get("request").user
         if user.is_anonymous:
             return False
+        if hasattr(object, "is_in_shopping_cart"):
+            return object.is_in_shopping_cart
         return object.shopping_cart.filter(user=user).exists()
 
+    def get_author_is_subscribed(self, object):
+        """Method for getting subscription to author of recipe."""
+
+        user = self.context.get("request").user
+        if user.is_anonymous or object.author_id is None:
+            return False
+        if hasattr(object, "author_is_subscribed"):
+            return object.author_is_subscribed
+        return Subscription.objects.filter(
+            user=user,
+            author=object.author_id
+        ).exists()
+
+    def get_author_counters(self, object):
+        """Counters of author change too often to be stored in cards."""
+
+        if hasattr(object, "author_recipes_count"):
+            return object.author_recipes_count, object.author_followers_count
+        return User.objects.filter(pk=object.author_id).values_list(
+            "recipes_count", "followers_count"
+        ).first() or (0, 0)
+
+    def to_representation(self, instance):
+        """
+        Merges flags of current user and counters of author into stored
+        card of recipe. Recipes without card are serialized as is.
+        """
+
+        if not instance.card:
+            cards.fill([instance])
+        if not instance.card:
+            return super().to_representation(instance)
+
+        request = self.context.get("request")
+        card = instance.card
+        author, image = card["author"], card["image"]
+        if author is not None:
+            author = {key: author[key] for key in cards.AUTHOR_KEYS}
+            author["is_subscribed"] = self.get_author_is_subscribed(instance)
+            author["recipes_count"], author["followers_count"] = (
+                self.get_author_counters(instance)
+            )
+        if image and request is not None:
+            image = request.build_absolute_uri(image)
+        return {
+            "id": card["id"],
+            "tags": [
+                {key: tag[key] for key in cards.TAG_KEYS}
+                for tag in card["tags"]
+            ],
+            "author": author,
+            "ingredients": [
+                {key: ingredient[key] for key in cards.INGREDIENT_KEYS}
+                for ingredient in card["ingredients"]
+            ],
+            "is_favorited": self.get_is_favorited(instance),
+            "is_in_shopping_cart": self.get_is_in_shopping_cart(instance),
+            "favorites_count": instance.favorites_count,
+            "in_carts_count": instance.in_carts_count,
+            "name": card["name"],
+            "image": image,
+            "image_variants": self.get_image_variants(instance),
+            "text": card["text"],
+            "cooking_time": card["cooking_time"],
+            "version": instance.version,
+        }
+
 
 class FavoriteSerializer(serializers.ModelSerializer):
     """Serializer for adding/deleting recipe to favorite list."""
@@ -309,7 +563,26 @@ class FavoriteSerializer(serializers.ModelSerializer):
 
 
 class ShoppingCartSerializer(FavoriteSerializer):
-    """Serializer for adding/deleting recipe to shoplist."""
+    """
+    Serializer for adding/deleting recipe to shoplist. Total amounts of
+    ingredients are updated by signals in the same transaction.
+    """
 
     class Meta(FavoriteSerializer.Meta):
         model = models.ShoppingCart
+
+
+class BulkSerializer(serializers.Serializer):
+    """
+    Ids of recipes or authors for bulk changes, repeated ids are
+    dropped.
+    """
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_MAX_ITEMS,
+    )
+
+    def validate_ids(self, ids):
+        return list(dict.fromkeys(ids))
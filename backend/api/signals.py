@@ -0,0 +1,34 @@
+"""
+Signal receivers of api app.
+"""
+
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.versions import auth_version, bump_version
+from users.models import User
+
+from .authentication import TOKENS, token_cache_key
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """Logout, cached users of the token are not used anymore."""
+
+    TOKENS.delete(token_cache_key(instance.key))
+    transaction.on_commit(
+        partial(bump_version, auth_version(instance.user_id))
+    )
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    """Password, activity or other data of cached user is changed."""
+
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    transaction.on_commit(partial(bump_version, auth_version(instance.pk)))
@@ -0,0 +1,129 @@
+"""
+Shared fixtures of API tests.
+"""
+
+import base64
+import io
+import os
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.db import transaction
+from django.test import override_settings
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
+
+from recipes import cards, models
+from users.models import User
+
+
+def image_base64(color="red"):
+    buffer = io.BytesIO()
+    Image.new("RGB", (40, 30), color).save(buffer, "PNG")
+    return ("data:image/png;base64,"
+            + base64.b64encode(buffer.getvalue()).decode())
+
+
+class APITestBase(APITestCase):
+    """
+    Tags, ingredients, users and recipes of every test. Media, catalogs
+    and the cache are kept in a temporary directory, image variants are
+    not rendered. The cache is shared by processes like in production,
+    so versions are used, it is cleared before every test.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.settings_override = override_settings(
+            MEDIA_ROOT=cls.temp_dir,
+            CATALOGS_ROOT=cls.temp_dir,
+            IMAGE_WORKERS=0,
+            CACHES={"default": {
+                "BACKEND": "django.core.cache.backends.filebased."
+                           "FileBasedCache",
+                "LOCATION": os.path.join(cls.temp_dir, "cache"),
+            }},
+        )
+        cls.settings_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.settings_override.disable()
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags = [
+            models.Tag.objects.create(
+                name=f"tag {number}", color=color, slug=f"tag-{number}"
+            )
+            for number, color in enumerate(("#0000FF", "#FF0000"))
+        ]
+        cls.ingredients = [
+            models.Ingredient.objects.create(
+                name=name, measurement_unit="г"
+            )
+            for name in ("соль", "сахар", "мука", "масло")
+        ]
+        cls.users = [
+            User.objects.create_user(
+                email=f"user{number}@example.com",
+                username=f"user{number}",
+                password="Password123",
+                first_name="Имя",
+                last_name="Фамилия",
+            )
+            for number in range(3)
+        ]
+        cls.recipes = [
+            cls.create_recipe(cls.users[number % 2], f"Рецепт {number}")
+            for number in range(3)
+        ]
+
+    @classmethod
+    def create_recipe(cls, author, name, amounts=(100, 200)):
+        recipe = models.Recipe.objects.create(
+            author=author,
+            name=name,
+            image="recipes/image.png",
+            text="Текст",
+            cooking_time=10,
+        )
+        recipe.tags.set(cls.tags[:1])
+        models.RecipeIngredient.objects.bulk_create(
+            models.RecipeIngredient(
+                recipe=recipe, ingredient=ingredient, amount=amount
+            )
+            for ingredient, amount in zip(cls.ingredients, amounts)
+        )
+        cards.rebuild([recipe.id])
+        recipe.refresh_from_db()
+        return recipe
+
+    def setUp(self):
+        cache.clear()
+        # Fixtures are seen as committed: their callbacks must not
+        # stay pending, e.g. catalog rebuilds are scheduled once.
+        transaction.get_connection().run_on_commit.clear()
+
+    def client_for(self, user=None):
+        client = APIClient()
+        if user is not None:
+            token, _ = Token.objects.get_or_create(user=user)
+            client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        return client
+
+    def commit(self, function, *args, **kwargs):
+        """Calls function, on_commit callbacks are run as after commit."""
+
+        pending = transaction.get_connection().run_on_commit
+        start = len(pending)
+        with self.captureOnCommitCallbacks(execute=True):
+            result = function(*args, **kwargs)
+        del pending[start:]
+        return result
@@ -0,0 +1,69 @@
+"""
+Token authentication with cached users.
+"""
+
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from .. import authentication
+from .base import APITestBase
+
+
+class CachedTokenAuthenticationTests(APITestBase):
+
+    def setUp(self):
+        super().setUp()
+        authentication.TOKENS.entries.clear()
+        self.user = self.users[2]
+        self.token, _ = Token.objects.get_or_create(user=self.user)
+        self.backend = authentication.CachedTokenAuthentication()
+
+    def authenticate(self):
+        return self.backend.authenticate_credentials(self.token.key)[0]
+
+    def test_cached_user_is_used_without_queries(self):
+        self.authenticate()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate().id, self.user.id)
+
+    @override_settings(TOKEN_CACHE_SHARED=True)
+    def test_shared_cache_is_used_by_other_processes(self):
+        self.authenticate()
+        authentication.TOKENS.entries.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate().id, self.user.id)
+
+    def test_cached_user_is_a_copy(self):
+        self.authenticate().first_name = "Изменено"
+        self.assertEqual(self.authenticate().first_name, "Имя")
+
+    def test_logout_revokes_token(self):
+        self.authenticate()
+        response = self.commit(
+            self.client_for(self.user).post, "/api/auth/token/logout/"
+        )
+        self.assertEqual(response.status_code, 204)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_deactivated_user_is_rejected(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.commit(self.user.save)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_changed_user_is_read_again(self):
+        self.authenticate()
+        self.user.first_name = "Новое"
+        self.commit(self.user.save)
+        self.assertEqual(self.authenticate().first_name, "Новое")
+
+    @override_settings(CACHES={"default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }})
+    def test_not_cached_with_local_backend(self):
+        self.authenticate()
+        with self.assertNumQueries(1):
+            self.authenticate()
@@ -0,0 +1,50 @@
+"""
+Autocomplete of ingredients from in-process index.
+"""
+
+from recipes import models
+
+from .. import autocomplete
+from .base import APITestBase
+
+
+class AutocompleteTests(APITestBase):
+
+    def setUp(self):
+        super().setUp()
+        autocomplete.INGREDIENTS.snapshot = None
+
+    def names(self, query, format="json"):
+        response = self.client_for().get(
+            "/api/ingredients/", {"name": query, "format": format}
+        )
+        self.assertEqual(response.status_code, 200)
+        if format != "json":
+            return response
+        return [item["name"] for item in response.json()]
+
+    def test_prefix_goes_first_then_popular(self):
+        self.assertEqual(self.names("С"), ["сахар", "соль", "масло"])
+        self.assertEqual(self.names("ол"), ["соль"])
+        self.assertEqual(self.names("перец"), [])
+
+    def test_answered_without_queries(self):
+        autocomplete.INGREDIENTS.refresh()
+        with self.assertNumQueries(0):
+            self.names("мас")
+            self.names("мас", format="api")
+
+    def test_all_matches_are_returned(self):
+        models.Ingredient.objects.bulk_create(
+            models.Ingredient(name=f"перец {number}", measurement_unit="г")
+            for number in range(60)
+        )
+        self.assertEqual(len(self.names("перец")), 60)
+
+    def test_index_is_rebuilt_with_catalog(self):
+        self.assertEqual(self.names("перец"), [])
+        self.commit(
+            models.Ingredient.objects.create,
+            name="перец", measurement_unit="г",
+        )
+        self.assertEqual(self.names("пер"), ["перец"])
@@ -0,0 +1,107 @@
+"""
+Bulk favorite, shopping cart and subscription endpoints.
+"""
+
+from unittest import mock
+
+from django.db import IntegrityError, transaction
+from django.test import override_settings
+
+from recipes import bulk, models
+
+from .base import APITestBase
+
+
+class BulkTests(APITestBase):
+
+    def statuses(self, response):
+        return [(item["id"], item["status"]) for item in response.json()]
+
+    def test_add_and_remove_statuses(self):
+        user = self.users[2]
+        client = self.client_for(user)
+        first, second = self.recipes[0].id, self.recipes[1].id
+        self.commit(client.post, f"/api/recipes/{first}/favorite/")
+
+        response = self.commit(
+            client.post, "/api/recipes/favorite_many/",
+            {"ids": [first, second, 9999]}, format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.statuses(response), [
+            (first, bulk.EXISTS), (second, bulk.ADDED),
+            (9999, bulk.NOT_FOUND),
+        ])
+        self.assertEqual(
+            models.Recipe.objects.get(id=second).favorites_count, 1
+        )
+
+        response = self.commit(
+            client.delete, "/api/recipes/favorite_many/",
+            {"ids": [second, self.recipes[2].id]}, format="json",
+        )
+        self.assertEqual(self.statuses(response), [
+            (second, bulk.REMOVED), (self.recipes[2].id, bulk.MISSING),
+        ])
+        self.assertEqual(
+            models.Recipe.objects.get(id=second).favorites_count, 0
+        )
+
+    def test_subscribe_to_self_is_invalid(self):
+        user, author = self.users[2], self.users[0]
+        response = self.commit(
+            self.client_for(user).post, "/api/users/subscribe_many/",
+            {"ids": [user.id, author.id]}, format="json",
+        )
+        self.assertEqual(self.statuses(response), [
+            (user.id, bulk.INVALID), (author.id, bulk.ADDED),
+        ])
+        author.refresh_from_db()
+        self.assertEqual(author.followers_count, 1)
+
+    def test_cart_totals(self):
+        user = self.users[2]
+        self.commit(
+            self.client_for(user).post, "/api/recipes/shopping_cart_many/",
+            {"ids": [recipe.id for recipe in self.recipes]}, format="json",
+        )
+        self.assertEqual(
+            dict(models.ShoppingCartIngredient.objects.filter(
+                user=user
+            ).values_list("ingredient", "amount")),
+            {self.ingredients[0].id: 300, self.ingredients[1].id: 600},
+        )
+
+    def test_concurrent_insert_is_repeated(self):
+        user, recipe = self.users[2], self.recipes[0]
+        statuses = bulk._statuses
+
+        def stale_statuses(*args):
+            result = statuses(*args)
+            if not models.Favorite.objects.filter(user=user).exists():
+                # Added by a concurrent request after the statuses.
+                models.Favorite.objects.create(user=user, recipe=recipe)
+            return result
+
+        with mock.patch("recipes.bulk._statuses", stale_statuses), \
+                transaction.atomic():
+            result = bulk.add(
+                models.Favorite, "recipe", user,
+                [recipe.id, self.recipes[1].id],
+            )
+        self.assertEqual(result, {
+            recipe.id: bulk.EXISTS, self.recipes[1].id: bulk.ADDED,
+        })
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 1)
+
+    @override_settings(BULK_ATTEMPTS=3)
+    def test_other_errors_are_raised(self):
+        with mock.patch.object(
+            models.Favorite.objects, "bulk_create",
+            side_effect=IntegrityError,
+        ) as bulk_create:
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                bulk.add(models.Favorite, "recipe", self.users[2],
+                         [self.recipes[0].id])
+        self.assertEqual(bulk_create.call_count, 3)
@@ -0,0 +1,90 @@
+"""
+Total amounts of ingredients in shopping carts.
+"""
+
+from recipes import cart, models
+
+from .base import APITestBase
+
+
+class CartTotalsTests(APITestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.users[2]
+        self.client = self.client_for(self.user)
+
+    def totals(self, user=None):
+        return dict(models.ShoppingCartIngredient.objects.filter(
+            user=user or self.user
+        ).values_list("ingredient__name", "amount"))
+
+    def add(self, recipe):
+        response = self.commit(
+            self.client.post, f"/api/recipes/{recipe.id}/shopping_cart/"
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def assert_rebuilt_equal(self):
+        """Incremental totals are the same as computed from scratch."""
+
+        totals = self.totals()
+        cart.rebuild([self.user.id])
+        self.assertEqual(self.totals(), totals)
+
+    def test_add_and_remove_recipes(self):
+        self.add(self.recipes[0])
+        self.add(self.recipes[1])
+        self.assertEqual(self.totals(), {"соль": 200, "сахар": 400})
+        self.assert_rebuilt_equal()
+
+        self.commit(
+            self.client.delete,
+            f"/api/recipes/{self.recipes[0].id}/shopping_cart/",
+        )
+        self.assertEqual(self.totals(), {"соль": 100, "сахар": 200})
+        self.commit(
+            self.client.delete,
+            f"/api/recipes/{self.recipes[1].id}/shopping_cart/",
+        )
+        self.assertEqual(self.totals(), {})
+
+    def test_recipe_update_changes_totals_of_carts(self):
+        recipe = self.recipes[0]
+        self.add(recipe)
+        self.add(self.recipes[1])
+        response = self.commit(
+            self.client_for(recipe.author).patch,
+            f"/api/recipes/{recipe.id}/",
+            {"ingredients": [
+                {"id": self.ingredients[0].id, "amount": 50},
+                {"id": self.ingredients[2].id, "amount": 30},
+            ]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.totals(), {"соль": 150, "сахар": 200, "мука": 30}
+        )
+        self.assert_rebuilt_equal()
+
+    def test_deleted_recipe_leaves_carts(self):
+        recipe = self.recipes[0]
+        self.add(recipe)
+        self.add(self.recipes[1])
+        self.commit(
+            self.client_for(recipe.author).delete,
+            f"/api/recipes/{recipe.id}/",
+        )
+        self.assertEqual(self.totals(), {"соль": 100, "сахар": 200})
+        self.assert_rebuilt_equal()
+
+    def test_carts_of_other_users_are_kept(self):
+        self.add(self.recipes[0])
+        other = self.users[1]
+        self.commit(
+            self.client_for(other).post,
+            f"/api/recipes/{self.recipes[1].id}/shopping_cart/",
+        )
+        self.assertEqual(self.totals(other), {"соль": 100, "сахар": 200})
+        self.assertEqual(self.totals(), {"соль": 100, "сахар": 200})
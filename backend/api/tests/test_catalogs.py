@@ -0,0 +1,64 @@
+"""
+Pre-rendered catalogs of tags and ingredients.
+"""
+
+import json
+
+from django.db import DatabaseError, transaction
+
+from recipes import catalogs, models
+
+from .. import serializers
+from .base import APITestBase
+
+
+class CatalogTests(APITestBase):
+
+    def test_catalogs_match_serializers(self):
+        for catalog, serializer_class in (
+            (catalogs.TAGS, serializers.TagSerializer),
+            (catalogs.INGREDIENTS, serializers.IngredientSerializer),
+        ):
+            self.assertEqual(
+                json.loads(catalog.render()),
+                serializer_class(catalog.queryset.all(), many=True).data,
+            )
+
+    def test_list_is_catalog(self):
+        self.commit(
+            models.Tag.objects.create,
+            name="new", color="#00FF00", slug="new",
+        )
+        response = self.client_for().get("/api/tags/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [tag["slug"] for tag in json.loads(
+                b"".join(response.streaming_content)
+            )],
+            list(models.Tag.objects.values_list("slug", flat=True)),
+        )
+
+    def test_rebuilt_once_per_transaction(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            for number in range(3):
+                models.Tag.objects.create(
+                    name=f"new {number}", color=f"#00FF0{number}",
+                    slug=f"new-{number}",
+                )
+            models.Tag.objects.filter(slug="new-0").delete()
+        self.assertEqual(callbacks.count(catalogs.TAGS.rebuild), 1)
+
+    def test_rebuild_is_scheduled_after_rolled_back_savepoint(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            try:
+                with transaction.atomic():
+                    models.Tag.objects.create(
+                        name="lost", color="#00FF00", slug="lost"
+                    )
+                    raise DatabaseError
+            except DatabaseError:
+                pass
+            models.Tag.objects.create(
+                name="kept", color="#00FF01", slug="kept"
+            )
+        self.assertEqual(callbacks.count(catalogs.TAGS.rebuild), 1)
@@ -0,0 +1,152 @@
+"""
+Anonymous response cache and conditional requests.
+"""
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .base import APITestBase
+
+LOCAL_CACHES = {"default": {
+    "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+}}
+
+
+class AnonymousCacheTests(APITestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for()
+        self.recipe = self.recipes[0]
+
+    def names(self):
+        return [
+            recipe["name"]
+            for recipe in self.client.get("/api/recipes/").json()["results"]
+        ]
+
+    def rename(self, name):
+        response = self.commit(
+            self.client_for(self.recipe.author).patch,
+            f"/api/recipes/{self.recipe.id}/", {"name": name}, format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_second_request_is_cached(self):
+        names = self.names()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names(), names)
+
+    def test_change_invalidates_cache(self):
+        self.names()
+        self.rename("Новое имя")
+        self.assertIn("Новое имя", self.names())
+
+    @override_settings(CACHES=LOCAL_CACHES)
+    def test_not_cached_with_local_backend(self):
+        self.names()
+        with CaptureQueriesContext(connection) as queries:
+            self.names()
+        self.assertTrue(queries)
+
+
+class ConditionalGetTests(APITestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.users[2]
+        self.client = self.client_for(self.user)
+        self.recipe = self.recipes[0]
+        self.url = f"/api/recipes/{self.recipe.id}/"
+
+    def test_not_modified(self):
+        etag = self.client.get(self.url)["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_change_of_recipe_changes_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.commit(
+            self.client_for(self.recipe.author).patch,
+            self.url, {"cooking_time": 20}, format="json",
+        )
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_change_of_user_lists_changes_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.commit(self.client.post, f"{self.url}favorite/")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["is_favorited"])
+
+    def test_etag_is_per_user(self):
+        etag = self.client.get(self.url)["ETag"]
+        other = self.client_for(self.users[1])
+        response = other.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(CACHES=LOCAL_CACHES)
+    def test_no_validators_with_local_backend(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ETag", response)
+        self.assertNotIn("Last-Modified", response)
+
+
+class ReadAPIValidatorsTests(APITestBase):
+    """Tags, ingredients and users are validated by their own versions."""
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for()
+
+    def assert_not_modified(self, url, **headers):
+        response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, 304)
+
+    def test_lists_and_details(self):
+        for url in (
+            "/api/tags/",
+            f"/api/tags/{self.tags[0].id}/",
+            "/api/ingredients/",
+            "/api/ingredients/?name=с",
+            "/api/users/",
+            f"/api/users/{self.users[0].id}/",
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn("no-cache", response["Cache-Control"])
+                self.assert_not_modified(
+                    url, HTTP_IF_NONE_MATCH=response["ETag"]
+                )
+                self.assert_not_modified(
+                    url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+                )
+
+    def test_tag_change_changes_tags_only(self):
+        tags = self.client.get("/api/tags/")["ETag"]
+        ingredients = self.client.get("/api/ingredients/")["ETag"]
+        self.commit(self.tags[0].save)
+        self.assertEqual(
+            self.client.get(
+                "/api/tags/", HTTP_IF_NONE_MATCH=tags
+            ).status_code,
+            200,
+        )
+        self.assert_not_modified(
+            "/api/ingredients/", HTTP_IF_NONE_MATCH=ingredients
+        )
+
+    def test_user_change_changes_users(self):
+        url = f"/api/users/{self.users[0].id}/"
+        etag = self.client.get(url)["ETag"]
+        self.users[0].first_name = "Новое"
+        self.commit(self.users[0].save)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["first_name"], "Новое")
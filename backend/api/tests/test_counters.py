@@ -0,0 +1,84 @@
+"""
+Denormalized counters and their stamp in cached responses.
+"""
+
+from unittest import mock
+
+from recipes import counters, models
+from recipes.versions import CATALOG_VERSION, USERS_VERSION, get_version
+from users.models import User
+
+from .base import APITestBase
+
+
+class CountersTests(APITestBase):
+
+    def test_favorite_changes_counter_not_versions(self):
+        recipe = self.recipes[0]
+        versions = get_version(CATALOG_VERSION), get_version(USERS_VERSION)
+        client = self.client_for(self.users[2])
+
+        response = self.commit(
+            client.post, f"/api/recipes/{recipe.id}/favorite/"
+        )
+        self.assertEqual(response.status_code, 201)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 1)
+
+        self.commit(client.delete, f"/api/recipes/{recipe.id}/favorite/")
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 0)
+        self.assertEqual(
+            (get_version(CATALOG_VERSION), get_version(USERS_VERSION)),
+            versions,
+        )
+
+    def test_subscription_changes_followers_count(self):
+        author = self.users[0]
+        self.commit(
+            self.client_for(self.users[2]).post,
+            f"/api/users/{author.id}/subscribe/",
+        )
+        author.refresh_from_db()
+        self.assertEqual(author.followers_count, 1)
+
+    def test_counters_are_shown(self):
+        recipe = self.recipes[0]
+        self.commit(
+            self.client_for(self.users[2]).post,
+            f"/api/recipes/{recipe.id}/shopping_cart/",
+        )
+        data = self.client_for(self.users[1]).get(
+            f"/api/recipes/{recipe.id}/"
+        ).json()
+        self.assertEqual(data["in_carts_count"], 1)
+        self.assertEqual(data["author"]["recipes_count"], 2)
+
+    def test_counters_stamp_changes_etag(self):
+        client = self.client_for(self.users[1])
+        url = f"/api/recipes/{self.recipes[0].id}/"
+        with mock.patch("api.mixins.counters_stamp", return_value=(1, 60)):
+            etag = client.get(url)["ETag"]
+            self.assertEqual(
+                client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+            )
+        with mock.patch("api.mixins.counters_stamp", return_value=(2, 120)):
+            self.assertEqual(
+                client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200
+            )
+
+    def test_reconcile_fixes_drift(self):
+        models.Recipe.objects.filter(id=self.recipes[0].id).update(
+            favorites_count=5
+        )
+        User.objects.filter(id=self.users[0].id).update(recipes_count=0)
+
+        self.assertEqual(counters.reconcile(batch_size=2), 2)
+        self.assertEqual(
+            models.Recipe.objects.get(id=self.recipes[0].id).favorites_count,
+            0,
+        )
+        self.assertEqual(
+            User.objects.get(id=self.users[0].id).recipes_count, 2
+        )
+        self.assertEqual(counters.reconcile(batch_size=2), 0)
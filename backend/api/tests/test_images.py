@@ -0,0 +1,67 @@
+"""
+Saving of image variants rendered in background.
+"""
+
+import threading
+from concurrent.futures import Future
+from unittest import mock
+
+from django.test import override_settings
+
+from recipes import images
+
+from .base import APITestBase
+
+
+@override_settings(IMAGE_WORKERS=1)
+class ImageVariantsTests(APITestBase):
+    """
+    Connections are not closed after saving: the test transaction would
+    be lost, the test client does not close them after requests either.
+    """
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch("recipes.images.close_old_connections")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_variants_are_saved_by_request_thread(self):
+        recipe = self.recipes[0]
+        future = Future()
+        with mock.patch("recipes.images.submit", return_value=future):
+            images.schedule(recipe.id, recipe.image.name)
+
+        saving_threads = []
+        save = images.save
+
+        def record_thread(*args):
+            saving_threads.append(threading.current_thread())
+            return save(*args)
+
+        # The pool completes futures in its own thread.
+        worker = threading.Thread(target=future.set_result, args=(
+            ({("small", "webp"): b"variant"}, "data:placeholder"),
+        ))
+        with mock.patch("recipes.images.save", side_effect=record_thread):
+            worker.start()
+            worker.join()
+            recipe.refresh_from_db()
+            self.assertEqual(recipe.image_variants, {})
+
+            self.client_for().get("/api/recipes/")
+        self.assertEqual(saving_threads, [threading.current_thread()])
+        recipe.refresh_from_db()
+        self.assertEqual(
+            recipe.image_variants["placeholder"], "data:placeholder"
+        )
+        self.assertIn("webp", recipe.image_variants["small"])
+
+    def test_failed_render_is_logged(self):
+        recipe = self.recipes[0]
+        future = Future()
+        with mock.patch("recipes.images.submit", return_value=future):
+            images.schedule(recipe.id, recipe.image.name)
+        future.set_exception(OSError("broken image"))
+        with self.assertLogs("recipes.images", "ERROR"):
+            images.save_finished()
@@ -0,0 +1,78 @@
+"""
+Cursor pagination of recipes.
+"""
+
+from django.utils import timezone
+
+from recipes import models
+from users.models import Subscription
+
+from .base import APITestBase
+
+
+class CursorPaginationTests(APITestBase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for number in range(3, 8):
+            cls.create_recipe(cls.users[0], f"Рецепт {number}")
+        # Rows with equal dates are told apart by id.
+        models.Recipe.objects.update(pub_date=timezone.now())
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for()
+        self.expected = list(models.Recipe.objects.order_by(
+            "-pub_date", "-id"
+        ).values_list("id", flat=True))
+
+    def ids(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [recipe["id"] for recipe in response.json()["results"]]
+
+    def test_pages_are_seeked_by_date_and_id(self):
+        ids, pages = [], []
+        response = self.client.get("/api/recipes/?cursor=&limit=3")
+        while True:
+            pages.append(self.ids(response))
+            ids += pages[-1]
+            if response.json()["next"] is None:
+                break
+            response = self.client.get(response.json()["next"])
+        self.assertEqual(ids, self.expected)
+        self.assertEqual([len(page) for page in pages], [3, 3, 2])
+
+    def test_previous_page(self):
+        first = self.client.get("/api/recipes/?cursor=&limit=3")
+        self.assertIsNone(first.json()["previous"])
+        second = self.client.get(first.json()["next"])
+        previous = self.client.get(second.json()["previous"])
+        self.assertEqual(self.ids(previous), self.ids(first))
+        self.assertIsNotNone(previous.json()["next"])
+
+    def test_cursor_with_search_is_rejected(self):
+        response = self.client.get("/api/recipes/?cursor=&search=Рецепт")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("cursor", response.json())
+
+    def test_invalid_cursor(self):
+        for cursor in ("garbage", "cD1bMV0=", "cD1bIngiLDFd"):
+            response = self.client.get(f"/api/recipes/?cursor={cursor}")
+            self.assertEqual(response.status_code, 404)
+
+    def test_subscriptions(self):
+        date = timezone.now()
+        for author in self.users[:2]:
+            Subscription.objects.create(user=self.users[2], author=author)
+        Subscription.objects.update(date_added=date)
+        client = self.client_for(self.users[2])
+        ids = []
+        response = client.get("/api/users/subscriptions/?cursor=&limit=1")
+        while True:
+            ids += self.ids(response)
+            if response.json()["next"] is None:
+                break
+            response = client.get(response.json()["next"])
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(set(ids), {user.id for user in self.users[:2]})
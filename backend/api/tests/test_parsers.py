@@ -0,0 +1,93 @@
+"""
+Bounded JSON and multipart bodies of recipes.
+"""
+
+import base64
+import io
+import json
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from PIL import Image
+
+from recipes import models
+
+from .base import APITestBase, image_base64
+
+URL = "/api/recipes/"
+
+
+def png(size=(40, 30)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "green").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class ParsersTests(APITestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for(self.users[2])
+        self.data = {
+            "tags": [self.tags[0].id],
+            "ingredients": [{"id": self.ingredients[0].id, "amount": 10}],
+            "name": "Новый",
+            "text": "Текст",
+            "cooking_time": 5,
+        }
+
+    def post_json(self, image):
+        return self.commit(
+            self.client.post, URL, {**self.data, "image": image},
+            format="json",
+        )
+
+    def post_multipart(self, content, data=None):
+        return self.commit(self.client.post, URL, {
+            "data": json.dumps(self.data if data is None else data),
+            "image": SimpleUploadedFile("image.png", content, "image/png"),
+        }, format="multipart")
+
+    def test_json_with_base64_image(self):
+        response = self.post_json(image_base64())
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(
+            models.Recipe.objects.get(id=response.json()["id"]).image
+        )
+
+    @override_settings(JSON_MAX_BODY_SIZE=1024)
+    def test_large_json_body_is_rejected(self):
+        image = "data:image/png;base64," + base64.b64encode(
+            b"0" * 2048
+        ).decode()
+        self.assertEqual(self.post_json(image).status_code, 413)
+
+    @override_settings(IMAGE_MAX_UPLOAD_SIZE=64)
+    def test_large_base64_image_is_rejected(self):
+        response = self.post_json(image_base64())
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json()["image"], [settings.IMAGE_SIZE_ERROR]
+        )
+
+    @override_settings(IMAGE_MAX_PIXELS=100)
+    def test_image_with_many_pixels_is_rejected(self):
+        response = self.post_json(image_base64())
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_base64_image(self):
+        response = self.post_json("data:image/png;base64,!!!")
+        self.assertEqual(response.status_code, 400)
+
+    def test_multipart(self):
+        response = self.post_multipart(png())
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["name"], "Новый")
+
+    @override_settings(IMAGE_MAX_UPLOAD_SIZE=64)
+    def test_large_multipart_image_is_rejected(self):
+        self.assertEqual(self.post_multipart(png()).status_code, 413)
+
+    def test_multipart_data_must_be_object(self):
+        self.assertEqual(self.post_multipart(png(), []).status_code, 400)
@@ -0,0 +1,74 @@
+"""
+Download of shopping list.
+"""
+
+from django.db.models import F, Sum
+
+from recipes import models
+
+from .base import APITestBase
+
+URL = "/api/recipes/download_shopping_cart/"
+
+
+class ShoppingListTests(APITestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.users[2]
+        self.client = self.client_for(self.user)
+        # Another ingredient with the same name and unit as the first one.
+        self.duplicate = models.Ingredient.objects.create(
+            name=self.ingredients[0].name, measurement_unit="г"
+        )
+        models.RecipeIngredient.objects.create(
+            recipe=self.recipes[1], ingredient=self.duplicate, amount=7
+        )
+        for recipe in self.recipes[:2]:
+            self.add(recipe)
+
+    def add(self, recipe):
+        self.commit(
+            models.ShoppingCart.objects.create, user=self.user, recipe=recipe
+        )
+
+    def expected(self):
+        """Lines as the list was aggregated from recipes before."""
+
+        return "\n".join(
+            f"{row['name']}: {row['amount']} {row['measurement']}"
+            for row in models.RecipeIngredient.objects.filter(
+                recipe__shopping_cart__user=self.user
+            ).values(
+                name=F("ingredient__name"),
+                measurement=F("ingredient__measurement_unit"),
+            ).annotate(amount=Sum("amount")).order_by("name", "measurement")
+        ).encode()
+
+    def download(self):
+        response = self.client.get(URL)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(
+            response.streaming_content if response.streaming
+            else [response.content]
+        )
+
+    def test_same_names_are_one_line(self):
+        content = self.download()
+        self.assertEqual(content, self.expected())
+        self.assertIn("соль: 207 г".encode(), content)
+
+    def test_cached_list_does_not_read_cart(self):
+        content = self.download()
+        # Only existence of the cart, the user is cached by token.
+        with self.assertNumQueries(1):
+            self.assertEqual(self.download(), content)
+
+    def test_cart_change_renders_new_list(self):
+        self.download()
+        self.add(self.recipes[2])
+        self.assertEqual(self.download(), self.expected())
+
+    def test_empty_cart(self):
+        models.ShoppingCart.objects.filter(user=self.user).delete()
+        self.assertEqual(self.client.get(URL).status_code, 400)
@@ -0,0 +1,64 @@
+"""
+Optimistic concurrency of recipe updates.
+"""
+
+from django.conf import settings
+
+from recipes import models
+
+from .base import APITestBase
+
+
+class RecipeVersionTests(APITestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.recipes[0]
+        self.client = self.client_for(self.recipe.author)
+        self.url = f"/api/recipes/{self.recipe.id}/"
+
+    def patch(self, **data):
+        return self.client.patch(self.url, data, format="json")
+
+    def stored_version(self):
+        return models.Recipe.objects.get(id=self.recipe.id).version
+
+    def test_update_increments_version(self):
+        response = self.patch(name="Новое имя", version=1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["version"], 2)
+        self.assertEqual(self.stored_version(), 2)
+
+    def test_outdated_version_is_conflict(self):
+        self.assertEqual(self.patch(name="Первое", version=1).status_code, 200)
+        response = self.patch(name="Второе", version=1)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json(), {"detail": settings.VERSION_ERROR})
+        self.assertEqual(
+            models.Recipe.objects.get(id=self.recipe.id).name, "Первое"
+        )
+
+    def test_update_without_changes_keeps_version(self):
+        response = self.patch(
+            name=self.recipe.name,
+            tags=[self.tags[0].id],
+            ingredients=[
+                {"id": self.ingredients[0].id, "amount": 100},
+                {"id": self.ingredients[1].id, "amount": 200},
+            ],
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["version"], 1)
+        self.assertEqual(self.stored_version(), 1)
+
+    def test_outdated_update_without_changes_is_conflict(self):
+        self.patch(cooking_time=20)
+        self.assertEqual(self.patch(cooking_time=20, version=1).status_code,
+                         409)
+
+    def test_changed_ingredients_increment_version(self):
+        response = self.patch(ingredients=[
+            {"id": self.ingredients[0].id, "amount": 150},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stored_version(), 2)
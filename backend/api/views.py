@@ -2,9 +2,15 @@
 View-functions.
 """
 
+import os
+from collections import defaultdict
+
 from django.conf import settings
-from django.db.models import F, Sum
-from django.http import HttpResponse
+from django.core.cache import cache
+from django.db.models import Exists, F, OuterRef, Sum, Window
+from django.db.models.functions import RowNumber
+from django.db.transaction import atomic
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet as DjoserUserViewSet
@@ -13,27 +19,116 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
-from recipes import models
+from recipes import bulk, catalogs, models
+from recipes.versions import (CATALOG_VERSION, INGREDIENTS_VERSION,
+                              TAGS_VERSION, USERS_VERSION, cart_version,
+                              get_stamps, versions_shared)
 from users.models import Subscription, User
 
-from . import serializers
+from . import autocomplete, serializers
 from .filters import IngredientFilter, RecipeFilter
-from .paginations import CustomPagination
+from .mixins import (AnonymousCacheMixin, AutocompleteMixin, CatalogMixin,
+                     ConditionalGetMixin)
+from .paginations import (CustomPagination, FeedPagination,
+                          SubscriptionPagination)
+from .parsers import BoundedJSONParser, RecipeMultiPartParser
 from .permissions import AdminOrReadOnly, AuthorAdminOrReadOnly
+from .renderers import SHOPPING_LIST_RENDERERS, FormatNegotiation
+
+
+def subscribed_to(user, author):
+    """Subquery that checks whether user is subscribed to author."""
+
+    return Exists(Subscription.objects.filter(user=user, author=author))
+
+
+def shopping_list_key(user, format):
+    """
+    Cache key of rendered shopping list: versions of the cart and of
+    ingredients names, the cart itself is not read.
+    """
+
+    cart, ingredients = get_stamps(
+        (cart_version(user.id), INGREDIENTS_VERSION)
+    )
+    return f"shopping_list:{format}:{user.id}:{cart[0]}:{ingredients[0]}"
+
+
+def cached_stream(chunks, key):
+    """
+    Passes chunks through and caches the whole content, if it is not
+    larger than SHOPPING_LIST_CACHE_MAX_SIZE.
+    """
+
+    content, size = [], 0
+    for chunk in chunks:
+        size += len(chunk)
+        if size <= settings.SHOPPING_LIST_CACHE_MAX_SIZE:
+            content.append(chunk)
+        yield chunk
+    if size <= settings.SHOPPING_LIST_CACHE_MAX_SIZE:
+        cache.set(key, b"".join(content), settings.SHOPPING_LIST_CACHE_TIMEOUT)
+
+
+def attach_recipe_previews(authors, recipe_limit=None):
+    """
+    Loads the newest recipes of authors by one query and stores them in
+    "recipe_previews" attribute. Number of recipes of each author is
+    limited by window function.
+    """
+
+    previews = models.Recipe.objects.filter(author__in=authors).only(
+        *serializers.BaseRecipeSerializer.Meta.fields, "author"
+    ).order_by("-pub_date", "-id")
+    if recipe_limit is not None:
+        previews = previews.annotate(
+            row_number=Window(
+                RowNumber(),
+                partition_by=F("author"),
+                order_by=(F("pub_date").desc(), F("id").desc()),
+            )
+        ).filter(row_number__lte=recipe_limit)
+
+    recipes = defaultdict(list)
+    for recipe in previews:
+        recipes[recipe.author_id].append(recipe)
+    for author in authors:
+        author.recipe_previews = recipes[author.id]
+
+
+def bulk_response(request, model, fk, excluded=()):
+    """
+    Adds (POST) or removes (DELETE) objects by list of ids in "ids" and
+    answers with status of every id.
+    """
+
+    serializer = serializers.BulkSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    pks = serializer.validated_data["ids"]
+    with atomic():
+        if request.method == "POST":
+            statuses = bulk.add(model, fk, request.user, pks, excluded)
+        else:
+            statuses = bulk.remove(model, fk, request.user, pks)
+    return Response(
+        [{"id": pk, "status": status} for pk, status in statuses.items()]
+    )
+
 
 # -----------------------------------------------------------------------------
 #                            Users app
 # -----------------------------------------------------------------------------
 
 
-class UserViewSet(DjoserUserViewSet):
+class UserViewSet(ConditionalGetMixin, DjoserUserViewSet):
     """
     Viewset for User model.
 
     Has standart pagination. Any users can gat safe methods.
 
     Action-methods: "subscription" and "subscribe" - to check
-    users subscription, follow and unfollow authors.
+    users subscription, follow and unfollow authors, "subscribe_many" -
+    to follow and unfollow list of authors.
     """
 
     queryset = User.objects.all()
@@ -41,12 +136,30 @@ class UserViewSet(DjoserUserViewSet):
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
     pagination_class = CustomPagination
     http_method_names = ["get", "post", "delete", "head"]
+    etag_versions = (USERS_VERSION,)
+    per_user = True
+    shows_counters = True
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if user.is_authenticated:
+            queryset = queryset.annotate(
+                is_subscribed=subscribed_to(user, OuterRef("pk"))
+            )
+        return queryset
 
     def get_permissions(self):
         if self.action == "me":
             self.permission_classes = (permissions.IsAuthenticated,)
         return super().get_permissions()
 
+    @action(["get", "put", "patch", "delete"], detail=False)
+    def me(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().me, request, *args, **kwargs
+        )
+
     @action(methods=["POST", "DELETE"],
             detail=True, )
     def subscribe(self, request, id):
@@ -56,17 +169,20 @@ class UserViewSet(DjoserUserViewSet):
             user=user, author=author)
 
         if request.method == "POST":
+            recipe_limit = serializers.get_recipe_limit(request)
             if subscription.exists():
                 return Response({"error": "Youre alredy subscribed"},
                                 status=status.HTTP_400_BAD_REQUEST)
             if user == author:
                 return Response({"error": "Unable to subscribe to yourself"},
                                 status=status.HTTP_400_BAD_REQUEST)
+            attach_recipe_previews([author], recipe_limit)
+            Subscription.objects.create(user=user, author=author)
+            author.refresh_from_db(fields=("followers_count",))
             serializer = serializers.SubscribeSerializer(
                 author,
                 context={"request": request}
             )
-            Subscription.objects.create(user=user, author=author)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         if request.method == "DELETE":
@@ -76,11 +192,25 @@ class UserViewSet(DjoserUserViewSet):
             return Response({"error": "Вы не подписаны на этого пользователя"},
                             status=status.HTTP_400_BAD_REQUEST)
 
-    @action(detail=False, permission_classes=[permissions.IsAuthenticated])
+    @action(methods=["POST", "DELETE"], detail=False,
+            permission_classes=(permissions.IsAuthenticated,))
+    def subscribe_many(self, request):
+        """Follow or unfollow authors by list of ids."""
+
+        return bulk_response(
+            request, Subscription, "author", excluded={request.user.id}
+        )
+
+    @action(detail=False, permission_classes=[permissions.IsAuthenticated],
+            pagination_class=SubscriptionPagination)
     def subscriptions(self, request):
         user = request.user
-        follows = User.objects.filter(following__user=user)
+        recipe_limit = serializers.get_recipe_limit(request)
+        follows = User.objects.filter(following__user=user).annotate(
+            subscription_date=F("following__date_added"),
+        ).order_by("username")
         page = self.paginate_queryset(follows)
+        attach_recipe_previews(page, recipe_limit)
         serializer = serializers.SubscribeSerializer(
             page, many=True,
             context={"request": request})
@@ -92,25 +222,32 @@ class UserViewSet(DjoserUserViewSet):
 # -----------------------------------------------------------------------------
 
 
-class TagViewSet(ModelViewSet):
+class TagViewSet(ConditionalGetMixin, CatalogMixin, ModelViewSet):
     """
     Viewset for Tag model.
 
     Has no pagination. Only admin can change this model.
+    List is answered with pre-rendered catalog.
     """
 
     queryset = models.Tag.objects.all()
     serializer_class = serializers.TagSerializer
     permission_classes = (AdminOrReadOnly,)
     pagination_class = None
+    etag_versions = (TAGS_VERSION,)
+    catalog = catalogs.TAGS
 
 
-class IngredientViewSet(ModelViewSet):
+class IngredientViewSet(ConditionalGetMixin, CatalogMixin, AutocompleteMixin,
+                        ModelViewSet):
     """
     Viewset for Ingredient model.
 
     Has no pagination. Only admin can change this model.
-    Has searching by name without register sensitivity.
+    Has searching by name without register sensitivity, it is answered
+    from in-process index: first go names that start with the query,
+    then popular ones.
+    Unfiltered list is answered with pre-rendered catalog.
     """
 
     queryset = models.Ingredient.objects.all()
@@ -119,15 +256,27 @@ class IngredientViewSet(ModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
     pagination_class = None
+    etag_versions = (INGREDIENTS_VERSION,)
+    catalog = catalogs.INGREDIENTS
+    search_index = autocomplete.INGREDIENTS
 
 
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(ConditionalGetMixin, AnonymousCacheMixin,
+                    ModelViewSet):
     """
     Viewset for Recipe model.
 
-    Has standart pagination. Author and admin can change this model.
+    Has standart pagination, cursor pagination is switched on by
+    "cursor" query parameter. Author and admin can change this model.
+
+    Can be filtred by author, tags, favorites and shopping cart, has
+    full-text search by "search" query parameter.
+
+    List and detail pages are cached for anonymous users and support
+    conditional requests.
 
-    Can be filtred by author, tags, favorites and shopping cart.
+    Recipe is accepted as JSON with base64 image or as multipart form
+    with JSON part "data" and file part "image".
 
     Has method "get_serializer_class" to select serializer by
     http method.
@@ -138,8 +287,42 @@ class RecipeViewSet(ModelViewSet):
     permission_classes = (AuthorAdminOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
-    pagination_class = CustomPagination
+    pagination_class = FeedPagination
+    parser_classes = (BoundedJSONParser, RecipeMultiPartParser)
+    etag_versions = (CATALOG_VERSION,)
+    per_user = True
+    shows_counters = True
+
+    def get_queryset(self):
+        """
+        Shared queryset for list and retrieve.
+
+        Tags, ingredients and author are taken from the stored card of
+        recipe, counters of author are joined, user-dependent flags are
+        annotated with Exists() subqueries, so a page costs a fixed
+        number of queries.
+        """
 
+        user = self.request.user
+        queryset = models.Recipe.objects.annotate(
+            author_recipes_count=F("author__recipes_count"),
+            author_followers_count=F("author__followers_count"),
+        )
+        if user.is_authenticated:
+            queryset = queryset.annotate(
+                is_favorited=Exists(models.Favorite.objects.filter(
+                    user=user, recipe=OuterRef("pk")
+                )),
+                is_in_shopping_cart=Exists(
+                    models.ShoppingCart.objects.filter(
+                        user=user, recipe=OuterRef("pk")
+                    )
+                ),
+                author_is_subscribed=subscribed_to(user, OuterRef("author")),
+            )
+        return queryset
+
+    @atomic
     def action_post_delete(self, pk, serializer_class):
         user = self.request.user
         recipe = get_object_or_404(models.Recipe, pk=pk)
@@ -175,30 +358,71 @@ class RecipeViewSet(ModelViewSet):
 
         return self.action_post_delete(pk, serializers.ShoppingCartSerializer)
 
-    @action(methods=["GET"], detail=False)
+    @action(methods=["POST", "DELETE"], detail=False,
+            permission_classes=(permissions.IsAuthenticated,))
+    def favorite_many(self, request):
+        """Add or delete recipes in favorite list by list of ids."""
+
+        return bulk_response(request, models.Favorite, "recipe")
+
+    @action(methods=["POST", "DELETE"], detail=False,
+            permission_classes=(permissions.IsAuthenticated,))
+    def shopping_cart_many(self, request):
+        """Add or delete recipes in shop list by list of ids."""
+
+        return bulk_response(request, models.ShoppingCart, "recipe")
+
+    @action(methods=["GET"], detail=False,
+            permission_classes=(permissions.IsAuthenticated,),
+            renderer_classes=SHOPPING_LIST_RENDERERS,
+            content_negotiation_class=FormatNegotiation)
     def download_shopping_cart(self, request):
-        """Dowload shop list in [FILE_NAME].txt file."""
+        """
+        Dowload shop list in [FILE_NAME] file.
+
+        Format is selected by "format" query parameter: txt (default), csv,
+        json or pdf. The list is read from total amounts of ingredients
+        in shopping cart, grouped by name and measurement unit, and
+        streamed from server-side cursor. Rendered files are cached by
+        version of the cart.
+        """
 
         user = self.request.user
         if not user.shopping_cart.exists():
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
-        ingredients = models.RecipeIngredient.objects.filter(
-            recipe__shopping_cart__user=request.user).values(
-            name=F("ingredient__name"),
-            measurement=F("ingredient__measurement_unit")
-        ).annotate(amount=Sum("amount"))
-
-        shopping_list = []
-
-        for units in ingredients:
-            shopping_list.append(
-                f"{units['name']}: {units['amount']} {units['measurement']}"
+        renderer = request.accepted_renderer
+        ingredients = models.ShoppingCartIngredient.objects.filter(user=user)
+        # Cart versions bumped in other workers are not seen with a
+        # process-local cache, the list is rendered every time then.
+        key = content = None
+        if versions_shared():
+            key = shopping_list_key(user, renderer.format)
+            content = cache.get(key)
+        if content is not None:
+            response = HttpResponse(
+                content, content_type=renderer.content_type
+            )
+        else:
+            # Different ingredients may have the same name and unit, they
+            # are one line of the list.
+            rows = ingredients.values_list(
+                "ingredient__name", "ingredient__measurement_unit"
+            ).annotate(total=Sum("amount")).values_list(
+                "ingredient__name",
+                "total",
+                "ingredient__measurement_unit",
+            ).order_by(
+                "ingredient__name", "ingredient__measurement_unit"
+            ).iterator(chunk_size=settings.SHOPPING_LIST_CHUNK_SIZE)
+            chunks = renderer.stream(rows)
+            if key is not None:
+                chunks = cached_stream(chunks, key)
+            response = StreamingHttpResponse(
+                chunks, content_type=renderer.content_type
             )
-        shopping_list = "\n".join(shopping_list)
-        response = HttpResponse(
-            shopping_list, content_type="text.txt; charset=utf-8"
+        file_name = os.path.splitext(settings.FILE_NAME)[0]
+        response["Content-Disposition"] = (
+            "attachment; " + f"filename={file_name}.{renderer.format}"
         )
-        response["Content-Disposition"] = ("attachment; "
-                                           + f"filename={settings.FILE_NAME}")
         return response
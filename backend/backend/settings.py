@@ -36,9 +36,63 @@ MIN_AMOUNT_INGREDIENTS = 1
 
 # Pagination settings
 OBJECTS_PER_PAGE = 6
+MAX_PAGE_SIZE = 100
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+# Cache settings
+RESPONSE_CACHE_TIMEOUT = 60 * 15
+CARDS_BATCH_SIZE = 500
+COUNTERS_BATCH_SIZE = 1000
+COUNTERS_TTL = 60
+
+# Export and import settings
+TRANSFER_BATCH_SIZE = 1000
+TRANSFER_MEDIA_WORKERS = 8
+GENERATE_BATCH_SIZE = 5000
+BENCHMARK_SAMPLE_SIZE = 1000
+
+# Recipe images settings
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS") or 2)
+IMAGE_VARIANTS = {"thumbnail": 160, "card": 480, "detail": 1200}
+IMAGE_FORMATS = ("webp", "jpeg")
+IMAGE_QUALITY = 80
+IMAGE_PLACEHOLDER_SIZE = 16
+IMAGE_VARIANTS_DIR = "recipes/variants"
+IMAGE_BATCH_SIZE = 100
+IMAGE_GC_MIN_AGE = 60 * 60
+IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+IMAGE_MAX_PIXELS = 40_000_000
+IMAGE_DECODE_CHUNK_SIZE = 64 * 1024
+JSON_MAX_BODY_SIZE = IMAGE_MAX_UPLOAD_SIZE * 4 // 3 + 1024 * 1024
+
+# Authentication settings, users are cached by token only with a shared
+# cache backend (see CACHES)
+TOKEN_CACHE_TTL = 60
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_SHARED = os.getenv("TOKEN_CACHE_SHARED", "") == "True"
+
+# Profiling settings
+QUERY_PROFILING = os.getenv("QUERY_PROFILING", "") == "True"
+QUERY_REPEAT_THRESHOLD = 5
+
+# Full-text search settings
+SEARCH_CONFIG = "russian"
+
+# Ingredients autocomplete settings
+INGREDIENTS_INDEX_TTL = 60 * 5
 
 # Download file settings
 FILE_NAME = "shopping_list.txt"
+SHOPPING_LIST_CHUNK_SIZE = 500
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60
+SHOPPING_LIST_CACHE_MAX_SIZE = 1024 * 1024
+CART_BATCH_SIZE = 1000
+BULK_MAX_ITEMS = 100
+BULK_BATCH_SIZE = 1000
+BULK_ATTEMPTS = 3
+PDF_FONT = os.getenv(
+    "PDF_FONT", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+)
 
 # Objects creating settings
 PROHIBITED_NAMES = ("me", "you", "user",)
@@ -49,14 +103,18 @@ TAGS_ERROR = "Need one or more tags or tags not unique."
 INGREDIENTS_ERROR = "Need one or more ingredients or Ingredients not unique."
 AMOUNT_ERROR = "Need more ingredients amount."
 RECIPE_ERROR = "This recipe alredy in list!"
+RECIPE_LIMIT_ERROR = "Must be a non-negative integer."
+IMAGE_SIZE_ERROR = "Image is too large."
+IMAGE_PIXELS_ERROR = "Image has too many pixels."
+BODY_SIZE_ERROR = "Request body is too large."
+NOT_FOUND_ERROR = "Objects with ids {ids} do not exist."
+VERSION_ERROR = "Recipe is changed by another request, reload it."
+CURSOR_SEARCH_ERROR = "Cursor pages can not be ordered by search relevance."
 
 # Database filling info
-HELP_MESSAGE = "Loads data from .csv-files"
+HELP_MESSAGE = "Loads or updates tags and ingredients from .csv or .json files"
 DIRECTION_OF_FILES = './data/'
-ALREDY_LOADED_ERROR_MESSAGE = """Data already exists.
-If you need to reload data from the CSV file,
-first destroy the database. Then, run `python manage.py migrate`
-for a new empty database with tables"""
+LOAD_DATA_BATCH_SIZE = 1000
 
 # -----------------------------------------------------------------------------
 #                            .env settings
@@ -83,6 +141,19 @@ DATABASES = {
     }
 }
 
+# Local-memory cache is private to every process, so responses, ETags,
+# users by token and shopping lists are not cached with it. Use a shared
+# backend (e.g. django.core.cache.backends.redis.RedisCache) to cache them.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND",
+            "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+
 # -----------------------------------------------------------------------------
 #                            Base settings
 # -----------------------------------------------------------------------------
@@ -115,6 +186,8 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+CATALOGS_ROOT = os.path.join(BASE_DIR, "catalogs")
+
 INSTALLED_APPS = [
     "django.contrib.admin",
     "django.contrib.auth",
@@ -122,6 +195,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
 
     "recipes.apps.RecipesConfig",
     "users.apps.UsersConfig",
@@ -134,6 +208,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.middleware.QueryProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -202,7 +277,12 @@ REST_FRAMEWORK = {
     ],
 
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedTokenAuthentication",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.parsers.BoundedJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
     ],
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend",
@@ -2,41 +2,148 @@
 Admin zone config recipes.
 """
 
-from django.contrib.admin import ModelAdmin, TabularInline, register
+from django.contrib.admin import (ModelAdmin, SimpleListFilter, TabularInline,
+                                  register)
+from django.contrib.admin.views.main import PAGE_VAR
+from django.db.models import F, Q
 
-from recipes import models
+from recipes import cards, cart, models
+from recipes.pagination import EstimatedCountPaginator
+from recipes.search import search
+
+
+def bump_recipe_versions(recipe_ids):
+    """
+    Changes made in admin are updates of recipes too, so API updates
+    based on the loaded version are rejected.
+    """
+
+    models.Recipe.objects.filter(id__in=recipe_ids).update(
+        version=F("version") + 1
+    )
+
+
+class BaseAdmin(ModelAdmin):
+    """
+    Changelists of large tables: number of objects is estimated and total
+    number of objects is not counted at all.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class InputFilter(SimpleListFilter):
+    """
+    Filter with text input instead of the list of all distinct values.
+
+    "lookup" is applied to the queryset with the entered value.
+    """
+
+    template = "admin/input_filter.html"
+    lookup = None
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.lookup: self.value()})
+        return queryset
+
+    def choices(self, changelist):
+        yield {
+            "selected": not self.value(),
+            "query_string": changelist.get_query_string(
+                remove=[self.parameter_name]
+            ),
+            "display": "All",
+            "query_parts": [
+                (key, value) for key, value in changelist.params.items()
+                if key not in (self.parameter_name, PAGE_VAR)
+            ],
+        }
+
+
+class AuthorFilter(InputFilter):
+    title = "author username"
+    parameter_name = "author"
+    lookup = "author__username"
+
+
+class MeasurementUnitFilter(InputFilter):
+    title = "measurement unit"
+    parameter_name = "measurement_unit"
+    lookup = "measurement_unit"
+
+
+class RecipeCardsMixin:
+    """
+    Rebuilds cards of recipes that show changed or deleted objects.
+
+    "card_lookup" is the lookup from recipe to the model of admin.
+    """
+
+    card_lookup = None
+
+    def get_card_recipes(self, objects):
+        return list(models.Recipe.objects.filter(
+            **{f"{self.card_lookup}__in": objects}
+        ).values_list("id", flat=True).distinct())
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        cards.rebuild(self.get_card_recipes([obj]))
+
+    def delete_model(self, request, obj):
+        recipe_ids = self.get_card_recipes([obj])
+        super().delete_model(request, obj)
+        cards.rebuild(recipe_ids)
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = self.get_card_recipes(queryset)
+        super().delete_queryset(request, queryset)
+        cards.rebuild(recipe_ids)
 
 
 class IngredientInline(TabularInline):
     model = models.RecipeIngredient
     extra = 2
     min_num = 1
+    autocomplete_fields = ("ingredient",)
 
 
 @register(models.Ingredient)
-class IngredientAdmin(ModelAdmin):
+class IngredientAdmin(RecipeCardsMixin, BaseAdmin):
     """Admin zone registration for Ingredient model."""
 
+    card_lookup = "ingredients"
     list_display = ("name", "measurement_unit",)
     search_fields = ("name",)
-    list_filter = ("name",)
+    list_filter = (MeasurementUnitFilter,)
 
 
 @register(models.Tag)
-class TagAdmin(ModelAdmin):
+class TagAdmin(RecipeCardsMixin, BaseAdmin):
     """Admin zone registration for Tag model."""
 
+    card_lookup = "tags"
     list_display = ("name", "color", "slug",)
     search_fields = ("name", "color",)
 
 
 @register(models.Recipe)
-class RecipeAdmin(ModelAdmin):
+class RecipeAdmin(BaseAdmin):
     """Admin zone registration for Recipe model."""
 
     list_display = ("name", "author", "pub_date", "display_tags", "favorite",)
-    list_filter = ("name", "author", "tags",)
+    list_filter = ("tags", AuthorFilter,)
+    list_select_related = ("author",)
     search_fields = ("name",)
+    autocomplete_fields = ("author", "tags",)
     readonly_fields = ("favorite",)
     fields = ("image",
               ("name", "author"),
@@ -45,33 +152,87 @@ class RecipeAdmin(ModelAdmin):
               "favorite",)
     inlines = (IngredientInline,)
 
+    def get_queryset(self, request):
+        """Author is shown by __str__ in autocomplete too."""
+
+        return super().get_queryset(request).select_related(
+            "author"
+        ).prefetch_related("tags")
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Substring of name, so partial words are found while typing in
+        autocomplete, or full-text match of name, text and ingredients.
+        """
+
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(
+            Q(name__icontains=search_term)
+            | Q(id__in=search(
+                models.Recipe.objects.all(), search_term
+            ).values("id"))
+        ), False
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        if change:
+            bump_recipe_versions([form.instance.id])
+        cards.rebuild([form.instance.id])
+        cart.rebuild(cart.cart_users(form.instance.id))
+
     def display_tags(self, obj):
         return ", ".join([tag.name for tag in obj.tags.all()])
     display_tags.short_description = "Tags"
 
     def favorite(self, obj):
-        return obj.favorite.count()
+        return obj.favorites_count
 
 
 @register(models.RecipeIngredient)
-class RecipeIngredientAdmin(ModelAdmin):
+class RecipeIngredientAdmin(RecipeCardsMixin, BaseAdmin):
     """Admin zone registration for RecipeIngredient model."""
 
+    card_lookup = "recipe_ingredient"
     list_display = ("recipe", "ingredient", "amount",)
-    search_fields = ("recipe", "ingredient",)
+    list_select_related = ("recipe__author", "ingredient",)
+    search_fields = ("recipe__name", "ingredient__name",)
+    autocomplete_fields = ("recipe", "ingredient",)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        bump_recipe_versions([obj.recipe_id])
+        cart.rebuild(cart.cart_users(obj.recipe_id))
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        bump_recipe_versions([obj.recipe_id])
+        cart.rebuild(cart.cart_users(obj.recipe_id))
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = list(queryset.values_list("recipe", flat=True))
+        super().delete_queryset(request, queryset)
+        bump_recipe_versions(recipe_ids)
+        cart.rebuild(models.ShoppingCart.objects.filter(
+            recipe__in=recipe_ids
+        ).values_list("user", flat=True).distinct())
 
 
 @register(models.Favorite)
-class FavoriteAdmin(ModelAdmin):
+class FavoriteAdmin(BaseAdmin):
     """Admin zone registration for Favorite model."""
 
     list_display = ("recipe", "user",)
-    search_fields = ("recipe", "user",)
+    list_select_related = ("recipe__author", "user",)
+    search_fields = ("recipe__name", "user__username",)
+    autocomplete_fields = ("recipe", "user",)
 
 
 @register(models.ShoppingCart)
-class ShoppingCartAdmin(ModelAdmin):
+class ShoppingCartAdmin(BaseAdmin):
     """Admin zone registration for ShoppingCart model."""
 
     list_display = ("recipe", "user")
-    search_fields = ("recipe", "user")
+    list_select_related = ("recipe__author", "user",)
+    search_fields = ("recipe__name", "user__username",)
+    autocomplete_fields = ("recipe", "user",)
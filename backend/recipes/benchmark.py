@@ -0,0 +1,282 @@
+"""
+HTTP load benchmark of the API.
+
+Virtual users run in threads against a running server. Every virtual
+user logs in as one of the seeded users and repeatedly picks a weighted
+scenario, scenarios are methods of VirtualUser. Latency and status of
+every request are recorded by endpoint. Queries per request are read
+from "Server-Timing" header, so the server must run with
+QUERY_PROFILING=True to report them.
+"""
+
+import base64
+import io
+import random
+import re
+import threading
+import time
+
+import requests
+from PIL import Image
+
+SCENARIO_WEIGHTS = {
+    "feed": 30,
+    "filtered": 15,
+    "autocomplete": 20,
+    "recipe_write": 5,
+    "favorite": 10,
+    "cart": 10,
+    "subscriptions": 5,
+    "shopping_list": 5,
+}
+QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of sorted values."""
+
+    if not values:
+        return None
+    rank = max(int(len(values) * percent / 100 + 0.5), 1)
+    return values[min(rank, len(values)) - 1]
+
+
+def small_image():
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), "orange").save(buffer, "PNG")
+    return "data:image/png;base64," + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+class Fixtures:
+    """
+    Ids and names of seeded objects that scenarios refer to: "tags" and
+    "ingredients" are lists of (id, slug) and (id, name).
+    """
+
+    def __init__(self, recipe_ids, author_ids, tags, ingredients):
+        self.recipe_ids = recipe_ids
+        self.author_ids = author_ids
+        self.tags = tags
+        self.ingredients = ingredients
+        self.image = small_image()
+
+
+class Stats:
+    """Thread-safe records of requests by endpoint."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.records = {}
+        self.recording = False
+
+    def record(self, endpoint, status, seconds, queries):
+        if not self.recording:
+            return
+        with self.lock:
+            self.records.setdefault(endpoint, []).append(
+                (status, seconds, queries)
+            )
+
+    @staticmethod
+    def summarize(records, duration):
+        latencies = sorted(seconds * 1000 for _, seconds, _ in records)
+        queries = [count for _, _, count in records if count is not None]
+        statuses = {}
+        for status, _, _ in records:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        return {
+            "requests": len(records),
+            "rps": round(len(records) / duration, 2),
+            "errors": sum(
+                1 for status, _, _ in records
+                if status is None or status >= 500
+            ),
+            "statuses": statuses,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "mean_ms": sum(latencies) / len(latencies),
+            "queries": sum(queries) / len(queries) if queries else None,
+        }
+
+    def summary(self, duration):
+        """Returns results by endpoint and of all requests."""
+
+        endpoints = {
+            endpoint: self.summarize(records, duration)
+            for endpoint, records in sorted(self.records.items())
+        }
+        every = [
+            record for records in self.records.values()
+            for record in records
+        ]
+        return endpoints, self.summarize(every, duration) if every else {}
+
+
+class VirtualUser:
+    """Client of one seeded user, scenarios are its public methods."""
+
+    def __init__(self, base_url, fixtures, stats, rng, email, password):
+        self.base_url = base_url.rstrip("/")
+        self.fixtures = fixtures
+        self.stats = stats
+        self.rng = rng
+        self.session = requests.Session()
+        self.anonymous = requests.Session()
+        self.own_recipes = []
+        response = self.session.post(
+            self.url("/api/auth/token/login/"),
+            json={"email": email, "password": password},
+        )
+        response.raise_for_status()
+        self.session.headers["Authorization"] = (
+            f"Token {response.json()['auth_token']}"
+        )
+        # Shopping list is not empty for every user.
+        self.session.post(self.url(
+            f"/api/recipes/{rng.choice(fixtures.recipe_ids)}/shopping_cart/"
+        ))
+
+    def url(self, path):
+        return self.base_url + path
+
+    def request(self, endpoint, method, path, session=None, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = (session or self.session).request(
+                method, self.url(path), **kwargs
+            )
+        except requests.RequestException:
+            self.stats.record(endpoint, None, time.perf_counter() - start,
+                              None)
+            return None
+        seconds = time.perf_counter() - start
+        match = QUERIES.search(response.headers.get("Server-Timing", ""))
+        self.stats.record(endpoint, response.status_code, seconds,
+                          int(match.group(1)) if match else None)
+        return response
+
+    def feed(self):
+        """Anonymous browsing of the feed."""
+
+        self.request("feed", "GET", "/api/recipes/", session=self.anonymous,
+                     params={"page": self.rng.randint(1, 10)})
+
+    def filtered(self):
+        params = {"tags": [
+            slug for _, slug in self.rng.sample(
+                self.fixtures.tags, min(2, len(self.fixtures.tags))
+            )
+        ]}
+        choice = self.rng.random()
+        if choice < 0.3:
+            params["author"] = self.rng.choice(self.fixtures.author_ids)
+        elif choice < 0.6:
+            params["is_favorited"] = 1
+        self.request("filtered", "GET", "/api/recipes/", params=params)
+
+    def autocomplete(self):
+        name = self.rng.choice(self.fixtures.ingredients)[1]
+        self.request("autocomplete", "GET", "/api/ingredients/",
+                     params={"name": name[:self.rng.randint(1, 4)]})
+
+    def recipe_write(self):
+        """Creates a recipe or updates one of created ones."""
+
+        fixtures = self.fixtures
+        ingredients = [
+            {"id": ingredient_id, "amount": self.rng.randint(1, 500)}
+            for ingredient_id, _ in self.rng.sample(
+                fixtures.ingredients, min(8, len(fixtures.ingredients))
+            )
+        ]
+        if self.own_recipes and self.rng.random() < 0.7:
+            self.request(
+                "recipe_update", "PATCH",
+                f"/api/recipes/{self.rng.choice(self.own_recipes)}/",
+                json={"text": f"Updated {time.time()}",
+                      "ingredients": ingredients},
+            )
+            return
+        recipe = {
+            "tags": [self.rng.choice(fixtures.tags)[0]],
+            "ingredients": ingredients,
+            "name": f"Benchmark {self.rng.random()}",
+            "image": fixtures.image,
+            "text": "Benchmark recipe",
+            "cooking_time": self.rng.randint(5, 120),
+        }
+        response = self.request("recipe_create", "POST", "/api/recipes/",
+                                json=recipe)
+        if response is not None and response.status_code == 201:
+            self.own_recipes.append(response.json()["id"])
+
+    def toggle(self, name):
+        recipe_id = self.rng.choice(self.fixtures.recipe_ids)
+        path = f"/api/recipes/{recipe_id}/{name}/"
+        self.request(f"{name}_add", "POST", path)
+        self.request(f"{name}_remove", "DELETE", path)
+
+    def favorite(self):
+        self.toggle("favorite")
+
+    def cart(self):
+        self.toggle("shopping_cart")
+
+    def subscriptions(self):
+        self.request("subscriptions", "GET", "/api/users/subscriptions/",
+                     params={"recipe_limit": self.rng.randint(1, 5)})
+
+    def shopping_list(self):
+        self.request("shopping_list", "GET",
+                     "/api/recipes/download_shopping_cart/",
+                     params={"format": self.rng.choice(("txt", "csv"))})
+
+    def cleanup(self):
+        """Deletes created recipes, requests are not recorded."""
+
+        for recipe_id in self.own_recipes:
+            self.session.delete(self.url(f"/api/recipes/{recipe_id}/"))
+
+
+def run(base_url, fixtures, credentials, weights, concurrency, duration,
+        warmup, seed):
+    """
+    Runs virtual users for warmup + duration seconds, requests of the
+    warmup are not recorded. Returns (results by endpoint, total result).
+    """
+
+    stats = Stats()
+    names, values = zip(*weights.items())
+    start = time.monotonic() + warmup
+    deadline = start + duration
+    failures = []
+
+    def work(number):
+        rng = random.Random(f"{seed}:{number}")
+        try:
+            user = VirtualUser(base_url, fixtures, stats, rng,
+                               *credentials[number % len(credentials)])
+            while time.monotonic() < deadline:
+                getattr(user, rng.choices(names, values)[0])()
+            user.cleanup()
+        except Exception as error:
+            failures.append(error)
+
+    threads = [
+        threading.Thread(target=work, args=(number,), daemon=True)
+        for number in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(max(start - time.monotonic(), 0))
+    stats.recording = True
+    time.sleep(max(deadline - time.monotonic(), 0))
+    stats.recording = False
+    for thread in threads:
+        thread.join()
+    if failures and not stats.records:
+        raise failures[0]
+    return stats.summary(duration)
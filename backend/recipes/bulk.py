@@ -0,0 +1,107 @@
+"""
+Bulk changes of favorites, shopping carts and subscriptions.
+
+Objects are inserted by one multi-row INSERT, signals are not sent for
+it, so counters, cart totals and versions are maintained here the same
+way as signal receivers do for single objects. Objects are deleted by
+QuerySet.delete(), receivers are called for every deleted object.
+Functions must be called in a transaction.
+"""
+
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from recipes import cart, counters, models
+from recipes.versions import bump_version, user_version
+from users.models import User
+
+ADDED = "added"
+REMOVED = "removed"
+EXISTS = "exists"
+MISSING = "missing"
+NOT_FOUND = "not_found"
+INVALID = "invalid"
+
+
+def _lock_user(user_id):
+    """Bulk changes of one user are serialized by lock of user row."""
+
+    list(User.objects.select_for_update().filter(pk=user_id).values("pk"))
+
+
+def _added(model, fk, user_id, pks):
+    """Counters, cart totals and versions of objects added in bulk."""
+
+    if not pks:
+        return
+    for counter_model, field, counted, counted_fk in counters.COUNTERS:
+        if counted is model and counted_fk == fk:
+            counters.change_many(counter_model, field, pks, 1)
+    if model is models.ShoppingCart:
+        cart.rebuild([user_id])
+    transaction.on_commit(partial(bump_version, user_version(user_id)))
+
+
+def _statuses(model, fk, user, pks, excluded):
+    target = model._meta.get_field(fk).related_model
+    found = set(target.objects.filter(pk__in=pks).values_list(
+        "pk", flat=True
+    ))
+    existing = set(model.objects.filter(
+        user=user, **{f"{fk}__in": found}
+    ).values_list(fk, flat=True))
+    statuses = {}
+    for pk in pks:
+        if pk in excluded:
+            statuses[pk] = INVALID
+        elif pk not in found:
+            statuses[pk] = NOT_FOUND
+        elif pk in existing:
+            statuses[pk] = EXISTS
+        else:
+            statuses[pk] = ADDED
+    return statuses
+
+
+def add(model, fk, user, pks, excluded=()):
+    """
+    Adds objects referenced by "fk" to list of user.
+    Returns {pk: status}, statuses are in order of pks.
+
+    Single objects are added and targets are deleted without the lock of
+    user, so the INSERT may fail. Then statuses are computed again and
+    the INSERT is repeated, up to BULK_ATTEMPTS times.
+    """
+
+    _lock_user(user.pk)
+    for attempt in range(1, settings.BULK_ATTEMPTS + 1):
+        statuses = _statuses(model, fk, user, pks, excluded)
+        added = [pk for pk, status in statuses.items() if status == ADDED]
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    (model(user=user, **{f"{fk}_id": pk}) for pk in added),
+                    batch_size=settings.BULK_BATCH_SIZE,
+                )
+        except IntegrityError:
+            if attempt == settings.BULK_ATTEMPTS:
+                raise
+            continue
+        break
+    _added(model, fk, user.pk, added)
+    return statuses
+
+
+def remove(model, fk, user, pks):
+    """
+    Removes objects referenced by "fk" from list of user.
+    Returns {pk: status}, statuses are in order of pks.
+    """
+
+    _lock_user(user.pk)
+    objects = model.objects.filter(user=user, **{f"{fk}__in": pks})
+    existing = set(objects.values_list(fk, flat=True))
+    objects.delete()
+    return {pk: REMOVED if pk in existing else MISSING for pk in pks}
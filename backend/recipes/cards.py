@@ -0,0 +1,106 @@
+"""
+Stored cards of recipes.
+
+Card is the part of recipe representation that is the same for all
+users: tags, author, ingredients and fields of recipe. It is stored in
+"card" field of recipe as the API represents it, so lists of recipes
+are built without joins. "rebuild" must be called after every change of
+the recipe or of objects shown in it, it rebuilds search vectors of
+recipes too.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+
+from recipes import models
+from recipes.search import update_search_vectors
+from recipes.versions import bump_version
+
+# Keys of nested objects in order of the API. Stored JSON may lose the
+# order (e.g. jsonb in PostgreSQL).
+TAG_KEYS = ("id", "name", "color", "slug")
+AUTHOR_KEYS = ("id", "username", "email", "first_name", "last_name")
+INGREDIENT_KEYS = ("id", "name", "measurement_unit", "amount")
+
+
+def build(recipe):
+    """Card of recipe with prefetched tags, author and ingredients."""
+
+    author = recipe.author
+    return {
+        "id": recipe.id,
+        "tags": [
+            {key: getattr(tag, key) for key in TAG_KEYS}
+            for tag in recipe.tags.all()
+        ],
+        "author": None if author is None else {
+            key: getattr(author, key) for key in AUTHOR_KEYS
+        },
+        "ingredients": [
+            {
+                "id": item.ingredient.id,
+                "name": item.ingredient.name,
+                "measurement_unit": item.ingredient.measurement_unit,
+                "amount": item.amount,
+            }
+            for item in recipe.recipe_ingredient.all()
+        ],
+        "name": recipe.name,
+        "image": recipe.image.url if recipe.image else None,
+        "text": recipe.text,
+        "cooking_time": recipe.cooking_time,
+    }
+
+
+def build_many(recipe_ids):
+    """Yields batches of recipes with new cards, nothing is stored."""
+
+    recipe_ids = list(recipe_ids)
+    for start in range(0, len(recipe_ids), settings.CARDS_BATCH_SIZE):
+        recipes = list(models.Recipe.objects.filter(
+            id__in=recipe_ids[start:start + settings.CARDS_BATCH_SIZE]
+        ).select_related("author").prefetch_related(
+            "tags",
+            Prefetch(
+                "recipe_ingredient",
+                queryset=models.RecipeIngredient.objects.select_related(
+                    "ingredient"
+                ),
+            ),
+        ))
+        for recipe in recipes:
+            recipe.card = build(recipe)
+        yield recipes
+
+
+def rebuild(recipe_ids):
+    """Rebuilds cards of recipes. Returns dict of new cards by id."""
+
+    cards = {}
+    for recipes in build_many(recipe_ids):
+        models.Recipe.objects.bulk_update(recipes, ("card",))
+        update_search_vectors([recipe.id for recipe in recipes])
+        cards.update((recipe.id, recipe.card) for recipe in recipes)
+    if cards:
+        transaction.on_commit(bump_version)
+    return cards
+
+
+def fill(recipes):
+    """
+    Builds cards of recipes that have no card yet. They are not stored,
+    reading requests do not write: "build_cards" command stores missing
+    cards.
+    """
+
+    cards = {
+        recipe.id: recipe.card
+        for batch in build_many(
+            recipe.id for recipe in recipes if not recipe.card
+        )
+        for recipe in batch
+    }
+    for recipe in recipes:
+        if recipe.id in cards:
+            recipe.card = cards[recipe.id]
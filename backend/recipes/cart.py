@@ -0,0 +1,119 @@
+"""
+Maintenance of total amounts of ingredients in shopping carts.
+
+Functions must be called in the transaction that changes the carts or
+recipes in them. Cart versions of users are bumped after the commit, so
+rendered shopping lists are cached by version and are never re-read to
+compute a key.
+"""
+
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Greatest
+
+from recipes import models
+from recipes.versions import bump_version, cart_version
+
+
+def _bump_versions(user_ids):
+    for user_id in user_ids:
+        bump_version(cart_version(user_id))
+
+
+def _changed(user_ids):
+    """Bumps cart versions of users when the transaction is committed."""
+
+    user_ids = list(user_ids)
+    transaction.on_commit(partial(_bump_versions, user_ids))
+
+
+def _recipe_ingredients(recipe_id):
+    return models.RecipeIngredient.objects.filter(recipe=recipe_id)
+
+
+def _change_totals(recipe_id, user_ids, amount):
+    models.ShoppingCartIngredient.objects.filter(
+        user__in=user_ids,
+        ingredient__in=_recipe_ingredients(recipe_id).values("ingredient"),
+    ).update(amount=amount)
+
+
+def _recipe_amount(recipe_id):
+    return Subquery(_recipe_ingredients(recipe_id).filter(
+        ingredient=OuterRef("ingredient")
+    ).values("amount"))
+
+
+def add_recipe(recipe_id, user_ids):
+    """Adds ingredients of recipe to carts of users."""
+
+    ingredient_ids = list(
+        _recipe_ingredients(recipe_id).values_list("ingredient", flat=True)
+    )
+    if not ingredient_ids or not user_ids:
+        return
+    models.ShoppingCartIngredient.objects.bulk_create(
+        (
+            models.ShoppingCartIngredient(
+                user_id=user_id, ingredient_id=ingredient_id
+            )
+            for user_id in user_ids
+            for ingredient_id in ingredient_ids
+        ),
+        batch_size=settings.CART_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    _change_totals(
+        recipe_id, user_ids, F("amount") + _recipe_amount(recipe_id)
+    )
+    _changed(user_ids)
+
+
+def remove_recipe(recipe_id, user_ids):
+    """Removes ingredients of recipe from carts of users."""
+
+    if not user_ids:
+        return
+    _change_totals(
+        recipe_id,
+        user_ids,
+        Greatest(F("amount") - _recipe_amount(recipe_id), Value(0)),
+    )
+    models.ShoppingCartIngredient.objects.filter(
+        user__in=user_ids, amount=0
+    ).delete()
+    _changed(user_ids)
+
+
+def cart_users(recipe_id):
+    """Returns ids of users that have recipe in shopping cart."""
+
+    return list(models.ShoppingCart.objects.filter(
+        recipe=recipe_id
+    ).values_list("user", flat=True))
+
+
+def rebuild(user_ids):
+    """Recomputes totals of users from their shopping carts."""
+
+    totals = models.RecipeIngredient.objects.filter(
+        recipe__shopping_cart__user__in=user_ids
+    ).values("recipe__shopping_cart__user", "ingredient").annotate(
+        total=Sum("amount")
+    ).order_by()
+    models.ShoppingCartIngredient.objects.filter(user__in=user_ids).delete()
+    models.ShoppingCartIngredient.objects.bulk_create(
+        (
+            models.ShoppingCartIngredient(
+                user_id=row["recipe__shopping_cart__user"],
+                ingredient_id=row["ingredient"],
+                amount=row["total"],
+            )
+            for row in totals.iterator(chunk_size=settings.CART_BATCH_SIZE)
+        ),
+        batch_size=settings.CART_BATCH_SIZE,
+    )
+    _changed(user_ids)
@@ -0,0 +1,109 @@
+"""
+Pre-rendered catalogs of reference tables.
+
+Catalog is the JSON representation of the whole table, rendered once
+into a file in CATALOGS_ROOT. All workers of the node read the same
+file, so it is kept once in the page cache. The file is not mapped
+into memory: it is sent as FileResponse, for which gunicorn uses
+sendfile(), so the kernel sends it from the page cache without reading
+or mapping it in the worker.
+
+File is replaced atomically once per transaction that changes the
+table (see "schedule").
+"""
+
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.db import transaction
+
+from recipes import models
+
+
+class Catalog:
+    """
+    Pre-rendered representation of queryset: list of objects with
+    "fields", rendered as compact JSON like the API renders it.
+    """
+
+    def __init__(self, name, queryset, fields):
+        self.name = name
+        self.queryset = queryset
+        self.fields = fields
+
+    @property
+    def path(self):
+        return os.path.join(settings.CATALOGS_ROOT, f"{self.name}.json")
+
+    def render(self):
+        """Returns representation of the table as JSON bytes."""
+
+        return json.dumps(
+            list(self.queryset.values(*self.fields)),
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode()
+
+    def rebuild(self):
+        """Renders the catalog and atomically replaces its file."""
+
+        os.makedirs(settings.CATALOGS_ROOT, exist_ok=True)
+        content = self.render()
+        descriptor, temp_path = tempfile.mkstemp(
+            dir=settings.CATALOGS_ROOT, prefix=f".{self.name}."
+        )
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(content)
+                file.flush()
+                os.fsync(file.fileno())
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def schedule(self):
+        """
+        Rebuilds the catalog when the transaction is committed, once for
+        all changes of the transaction.
+        """
+
+        connection = transaction.get_connection()
+        # Callbacks of rolled back savepoints are dropped by Django, so
+        # pending callbacks are the reliable mark of a scheduled rebuild.
+        if any(
+            func == self.rebuild for _, func, _ in connection.run_on_commit
+        ):
+            return
+        transaction.on_commit(self.rebuild)
+
+    def stamp(self):
+        """Returns stamp of the file, that is changed on every rebuild."""
+
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def open(self):
+        """Opens file of the catalog, builds it if it does not exist."""
+
+        try:
+            return open(self.path, "rb")
+        except FileNotFoundError:
+            self.rebuild()
+            return open(self.path, "rb")
+
+
+TAGS = Catalog(
+    "tags", models.Tag.objects.all(), ("id", "name", "color", "slug")
+)
+INGREDIENTS = Catalog(
+    "ingredients",
+    models.Ingredient.objects.all(),
+    ("id", "name", "measurement_unit"),
+)
@@ -0,0 +1,76 @@
+"""
+Denormalized counters of recipes and users.
+
+Counters are changed by signals with F() expressions in the transaction
+that creates or deletes the counted object. Bulk operations and raw SQL
+bypass signals, function "reconcile" fixes counters that have drifted.
+Changes of counters do not bump versions, cached data is stamped with
+counters_stamp() (see versions.py).
+"""
+
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from recipes import models
+from users.models import Subscription, User
+
+# (model, counter field, counted model, foreign key of counted model)
+COUNTERS = (
+    (models.Recipe, "favorites_count", models.Favorite, "recipe"),
+    (models.Recipe, "in_carts_count", models.ShoppingCart, "recipe"),
+    (User, "recipes_count", models.Recipe, "author"),
+    (User, "followers_count", Subscription, "author"),
+)
+
+
+def change(model, field, pk, delta):
+    """Adds delta to counter, counters never become negative."""
+
+    if pk is None:
+        return
+    change_many(model, field, [pk], delta)
+
+
+def change_many(model, field, pks, delta):
+    """Adds delta to counters of objects by one UPDATE."""
+
+    model.objects.filter(pk__in=pks).update(
+        **{field: Greatest(F(field) + delta, Value(0))}
+    )
+
+
+def actual_count(counted, fk):
+    """Subquery that counts objects referencing the outer object."""
+
+    return Coalesce(
+        Subquery(
+            counted.objects.filter(**{fk: OuterRef("pk")}).order_by().values(
+                fk
+            ).annotate(count=Count("pk")).values("count")
+        ),
+        Value(0),
+    )
+
+
+def reconcile(batch_size):
+    """
+    Recomputes drifted counters. Objects are processed in batches of
+    primary keys, every batch is a separate short UPDATE, so rows are not
+    locked for long. Returns number of fixed counters.
+    """
+
+    fixed = 0
+    for model, field, counted, fk in COUNTERS:
+        actual = actual_count(counted, fk)
+        pks = model.objects.order_by("pk").values_list("pk", flat=True)
+        last_pk = None
+        while True:
+            batch = pks if last_pk is None else pks.filter(pk__gt=last_pk)
+            batch = list(batch[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1]
+            fixed += model.objects.filter(pk__in=batch).exclude(
+                **{field: actual}
+            ).update(**{field: actual})
+    return fixed
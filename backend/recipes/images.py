@@ -0,0 +1,172 @@
+"""
+Size variants of recipe images.
+
+Variants are rendered by a pool of processes after the transaction that
+stored the original is committed, so requests do not wait for them.
+Names of variant files and the placeholder are stored in
+"image_variants" field of recipe, it is empty until variants are ready.
+Variants are stored in the content-addressed storage too, recipes with
+the same image share them.
+
+Rendered variants are saved by request threads (see "save_finished"),
+not by the thread of the pool that completes futures: its database
+connection is not closed by request lifecycle and its writes competed
+with requests ("database is locked" on SQLite).
+"""
+
+import logging
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+
+from recipes import models
+from recipes.imaging import render_variants
+from recipes.storage import recipe_images
+from recipes.versions import CATALOG_VERSION, bump_version
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+# Completed renders waiting to be saved: (recipe_id, image, future).
+_finished = queue.SimpleQueue()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_WORKERS or None,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def arguments(image):
+    return (
+        recipe_images.path(image),
+        settings.IMAGE_VARIANTS,
+        settings.IMAGE_FORMATS,
+        settings.IMAGE_QUALITY,
+        settings.IMAGE_PLACEHOLDER_SIZE,
+    )
+
+
+def save(recipe_id, image, rendered):
+    """
+    Stores rendered variants if the recipe still has the same image.
+    Returns True if variants are stored.
+    """
+
+    variants, placeholder = rendered
+    names = {}
+    for (variant, format), content in variants.items():
+        names.setdefault(variant, {})[format] = recipe_images.save(
+            f"{settings.IMAGE_VARIANTS_DIR}/{variant}.{format}",
+            ContentFile(content),
+        )
+    updated = models.Recipe.objects.filter(id=recipe_id, image=image).update(
+        image_variants={**names, "placeholder": placeholder}
+    )
+    if updated:
+        bump_version(CATALOG_VERSION)
+    return bool(updated)
+
+
+def save_finished(**kwargs):
+    """
+    Saves variants rendered since the last call. Receiver of
+    "request_finished", so it runs in request threads after responses,
+    the connection is closed as at the end of request.
+    """
+
+    saved = False
+    while True:
+        try:
+            recipe_id, image, future = _finished.get_nowait()
+        except queue.Empty:
+            break
+        try:
+            save(recipe_id, image, future.result())
+        except Exception:
+            logger.exception("Image variants of recipe %s failed", recipe_id)
+        saved = True
+    if saved:
+        close_old_connections()
+
+
+def submit(image):
+    global _executor
+    try:
+        return get_executor().submit(render_variants, *arguments(image))
+    except BrokenProcessPool:
+        with _executor_lock:
+            _executor = None
+        return get_executor().submit(render_variants, *arguments(image))
+
+
+def schedule(recipe_id, image):
+    """
+    Renders variants of recipe image in the pool, variants of the same
+    image are copied from other recipe. With IMAGE_WORKERS = 0
+    nothing is rendered in background, "build_image_variants" command
+    renders variants on all cores.
+
+    It is called after the commit, so errors are logged and not raised:
+    the recipe is stored and "build_image_variants" renders its variants.
+    """
+
+    try:
+        return _schedule(recipe_id, image)
+    except Exception:
+        logger.exception("Scheduling of image variants of recipe %s failed",
+                         recipe_id)
+        return None
+
+
+def _schedule(recipe_id, image):
+    if not settings.IMAGE_WORKERS:
+        return None
+    variants = models.Recipe.objects.filter(image=image).exclude(
+        image_variants={}
+    ).values_list("image_variants", flat=True).first()
+    if variants:
+        models.Recipe.objects.filter(id=recipe_id, image=image).update(
+            image_variants=variants
+        )
+        bump_version(CATALOG_VERSION)
+        return None
+
+    future = submit(image)
+    future.add_done_callback(
+        lambda future: _finished.put((recipe_id, image, future))
+    )
+    return future
+
+
+def urls(variants, request=None):
+    """Representation of stored variants with URLs of files."""
+
+    def url(name):
+        url = recipe_images.url(name)
+        return request.build_absolute_uri(url) if request else url
+
+    if not variants:
+        return {}
+    representation = {
+        variant: {
+            format: url(variants[variant][format])
+            for format in settings.IMAGE_FORMATS
+            if format in variants[variant]
+        }
+        for variant in settings.IMAGE_VARIANTS if variant in variants
+    }
+    representation["placeholder"] = variants.get("placeholder")
+    return representation
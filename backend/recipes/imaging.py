@@ -0,0 +1,50 @@
+"""
+Rendering of image variants.
+
+Works in processes of the image pool, so the module depends on Pillow
+only and does not touch Django.
+"""
+
+import base64
+import io
+
+from PIL import Image, ImageOps
+
+MEDIA_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+
+def encode(image, format, quality):
+    if format == "jpeg" and image.mode != "RGB":
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A")
+                         if "A" in image.getbands() else None)
+        image = background
+    buffer = io.BytesIO()
+    image.save(buffer, format=format.upper(), quality=quality)
+    return buffer.getvalue()
+
+
+def render_variants(path, sizes, formats, quality, placeholder_size):
+    """
+    Returns ({(variant, format): bytes}, placeholder) for the image file.
+
+    Every variant fits into a square with side from "sizes", images are
+    never enlarged. Placeholder is a tiny JPEG as data URI.
+    """
+
+    with Image.open(path) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ("RGB", "RGBA"):
+            original = original.convert(
+                "RGBA" if "transparency" in original.info else "RGB"
+            )
+        variants = {}
+        for variant, size in sizes.items():
+            image = original.copy()
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+            for format in formats:
+                variants[variant, format] = encode(image, format, quality)
+        image = original.copy()
+        image.thumbnail((placeholder_size, placeholder_size))
+        placeholder = base64.b64encode(encode(image, "jpeg", 50)).decode()
+    return variants, f"data:{MEDIA_TYPES['jpeg']};base64,{placeholder}"
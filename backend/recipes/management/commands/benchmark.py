@@ -0,0 +1,171 @@
+"""
+Custom manage-commands.
+"""
+
+import json
+import os
+import subprocess
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.utils import timezone
+
+from recipes import benchmark
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+METRICS = ("rps", "p50_ms", "p95_ms", "p99_ms", "queries")
+
+
+def commit():
+    """Commit of the working tree, if it is a git repository."""
+
+    try:
+        return subprocess.run(
+            ("git", "rev-parse", "--short", "HEAD"),
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+class Command(BaseCommand):
+    """
+    Run HTTP load benchmark against a running server.
+
+    The database must be seeded by "generate_data", virtual users log in
+    as its users. Results are printed and saved as JSON, "--compare"
+    prints the change against saved results of a previous run.
+    """
+
+    help = "Measures latency and throughput of the API endpoints"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument(
+            "--concurrency", type=int, default=8,
+            help="Number of virtual users",
+        )
+        parser.add_argument(
+            "--duration", type=float, default=60,
+            help="Seconds of measuring",
+        )
+        parser.add_argument(
+            "--warmup", type=float, default=5,
+            help="Seconds before measuring",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--prefix", default="synthetic",
+                            help="Prefix of names of seeded users")
+        parser.add_argument("--password", default="synthetic",
+                            help="Password of seeded users")
+        parser.add_argument(
+            "--weight", action="append", default=[],
+            metavar="SCENARIO=WEIGHT",
+            help="Weight of scenario, 0 switches it off: "
+                 + ", ".join(benchmark.SCENARIO_WEIGHTS),
+        )
+        parser.add_argument(
+            "--output", default="benchmark.json",
+            help="Path of the JSON file with results",
+        )
+        parser.add_argument(
+            "--compare", help="Path of the JSON file of a previous run",
+        )
+
+    def handle(self, *args, **options):
+        weights = self.weights(options["weight"])
+        credentials = [
+            (email, options["password"]) for email in User.objects.filter(
+                username__startswith=options["prefix"], is_active=True
+            ).order_by("id").values_list(
+                "email", flat=True
+            )[:options["concurrency"]]
+        ]
+        if not credentials:
+            raise CommandError(
+                f'No users with prefix "{options["prefix"]}", '
+                'seed the database by "generate_data".'
+            )
+        fixtures = benchmark.Fixtures(
+            recipe_ids=list(Recipe.objects.order_by("?").values_list(
+                "id", flat=True
+            )[:settings.BENCHMARK_SAMPLE_SIZE]),
+            author_ids=list(User.objects.filter(
+                recipes_count__gt=0
+            ).order_by("-recipes_count").values_list(
+                "id", flat=True
+            )[:settings.BENCHMARK_SAMPLE_SIZE]),
+            tags=list(Tag.objects.values_list("id", "slug")),
+            ingredients=list(Ingredient.objects.order_by("?").values_list(
+                "id", "name"
+            )[:settings.BENCHMARK_SAMPLE_SIZE]),
+        )
+        if not (fixtures.recipe_ids and fixtures.tags
+                and fixtures.ingredients):
+            raise CommandError("Recipes, tags and ingredients are needed.")
+
+        print(f"Benchmarking {options['base_url']} for "
+              f"{options['duration']:.0f} s with "
+              f"{options['concurrency']} virtual users...")
+        endpoints, total = benchmark.run(
+            options["base_url"], fixtures, credentials, weights,
+            options["concurrency"], options["duration"], options["warmup"],
+            options["seed"],
+        )
+        results = {
+            "started": timezone.now().isoformat(),
+            "commit": commit(),
+            "base_url": options["base_url"],
+            "concurrency": options["concurrency"],
+            "duration": options["duration"],
+            "seed": options["seed"],
+            "weights": weights,
+            "endpoints": endpoints,
+            "total": total,
+        }
+        with open(options["output"], "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+        previous = {}
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as file:
+                previous = json.load(file)
+            previous = {**previous["endpoints"], "total": previous["total"]}
+        self.report(endpoints, total, previous)
+        print(f"Results are saved to {os.path.abspath(options['output'])}")
+
+    @staticmethod
+    def weights(values):
+        weights = dict(benchmark.SCENARIO_WEIGHTS)
+        for value in values:
+            name, _, weight = value.partition("=")
+            if name not in weights or not weight.isdigit():
+                raise CommandError(f'Wrong weight "{value}".')
+            weights[name] = int(weight)
+        weights = {name: weight for name, weight in weights.items() if weight}
+        if not weights:
+            raise CommandError("All scenarios are switched off.")
+        return weights
+
+    @staticmethod
+    def format(value):
+        return "-" if value is None else f"{value:.1f}"
+
+    def report(self, endpoints, total, previous):
+        """Prints table of results, changes against previous run."""
+
+        print(f"{'endpoint':<22}{'requests':>9}{'errors':>7}"
+              + "".join(f"{metric:>16}" for metric in METRICS))
+        for endpoint, result in (*endpoints.items(), ("total", total)):
+            if not result:
+                continue
+            line = (f"{endpoint:<22}{result['requests']:>9}"
+                    f"{result['errors']:>7}")
+            for metric in METRICS:
+                cell = self.format(result[metric])
+                old = previous.get(endpoint, {}).get(metric)
+                if old and result[metric] is not None:
+                    cell += f" ({(result[metric] - old) / old:+.0%})"
+                line += f"{cell:>16}"
+            print(line)
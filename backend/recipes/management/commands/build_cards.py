@@ -0,0 +1,43 @@
+"""
+Custom manage-commands.
+"""
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from recipes import cards
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """
+    Build stored cards of recipes.
+    By default only recipes without card are processed.
+    """
+
+    help = "Builds stored cards of recipes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Rebuild cards of all recipes",
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.order_by("id")
+        if not options["all"]:
+            recipes = recipes.filter(card={})
+        recipe_ids = recipes.values_list("id", flat=True)
+
+        print("Building cards...")
+
+        batch, total = [], 0
+        for recipe_id in recipe_ids.iterator():
+            batch.append(recipe_id)
+            if len(batch) == settings.CARDS_BATCH_SIZE:
+                total += len(cards.rebuild(batch))
+                batch = []
+        total += len(cards.rebuild(batch))
+
+        print(f"Building cards complete: {total}")
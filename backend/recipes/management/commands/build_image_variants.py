@@ -0,0 +1,65 @@
+"""
+Custom manage-commands.
+"""
+
+from concurrent.futures import as_completed
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from recipes import images
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """
+    Render size variants of recipe images in the pool of processes.
+    By default only recipes without variants are processed.
+    """
+
+    help = "Builds size variants of recipe images"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Rebuild variants of all recipes",
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image="").order_by("id")
+        if not options["all"]:
+            recipes = recipes.filter(image_variants={})
+        recipes = recipes.values_list("id", "image")
+
+        print("Building image variants...")
+
+        total = failed = 0
+        batch = []
+        for recipe in recipes.iterator():
+            batch.append(recipe)
+            if len(batch) == settings.IMAGE_BATCH_SIZE:
+                built = self.build(batch)
+                total, failed = total + built, failed + len(batch) - built
+                batch = []
+        built = self.build(batch)
+        total, failed = total + built, failed + len(batch) - built
+
+        print(f"Building image variants complete: {total}, failed: {failed}")
+
+    @staticmethod
+    def build(recipes):
+        """Renders variants of (id, image) pairs, returns number of saved."""
+
+        futures = {
+            images.submit(image): (recipe_id, image)
+            for recipe_id, image in recipes
+        }
+        built = 0
+        for future in as_completed(futures):
+            recipe_id, image = futures[future]
+            try:
+                built += images.save(recipe_id, image, future.result())
+            except Exception as error:
+                print(f"Recipe {recipe_id}: {error}")
+        return built
@@ -0,0 +1,77 @@
+"""
+Custom manage-commands.
+"""
+
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.utils import timezone
+
+from recipes.models import Recipe
+from recipes.storage import recipe_images
+
+
+def walk(storage, directory):
+    """Yields names of all files in the directory of storage."""
+
+    if not storage.exists(directory):
+        return
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield os.path.join(directory, name)
+    for name in directories:
+        yield from walk(storage, os.path.join(directory, name))
+
+
+class Command(BaseCommand):
+    """
+    Delete recipe images and image variants that no recipe references.
+    Recent files are kept, they may belong to uncommitted uploads.
+    """
+
+    help = "Deletes unreferenced recipe images"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=settings.IMAGE_GC_MIN_AGE,
+            help="Keep files younger than this number of seconds",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Show the number of files without deleting them",
+        )
+
+    def handle(self, *args, **options):
+        referenced = set()
+        recipes = Recipe.objects.values_list("image", "image_variants")
+        for image, variants in recipes.iterator():
+            referenced.add(image)
+            for variant, formats in variants.items():
+                if variant != "placeholder":
+                    referenced.update(formats.values())
+
+        print("Collecting images...")
+
+        deadline = timezone.now() - timedelta(seconds=options["min_age"])
+        directory = Recipe._meta.get_field("image").upload_to.rstrip("/")
+        deleted = 0
+        for name in walk(recipe_images, directory):
+            # Saving of the same content touches the file, and it may be
+            # referenced since the list was collected.
+            if (name in referenced
+                    or recipe_images.get_modified_time(name) > deadline
+                    or Recipe.objects.filter(image=name).exists()):
+                continue
+            if not options["dry_run"]:
+                recipe_images.delete(name)
+            deleted += 1
+
+        if options["dry_run"]:
+            print(f"Unreferenced images: {deleted}")
+        else:
+            print(f"Collecting images complete: {deleted}")
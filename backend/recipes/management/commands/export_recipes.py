@@ -0,0 +1,60 @@
+"""
+Custom manage-commands.
+"""
+
+import sys
+import time
+from collections import Counter
+
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from recipes.transfer import export_lines, snapshot
+
+
+class Command(BaseCommand):
+    """
+    Export recipes with users, tags, ingredients, favorites, shopping
+    carts and subscriptions as NDJSON. Records are streamed, so memory
+    does not depend on size of the database. Password hashes are left
+    out unless "--with-passwords" is given.
+    """
+
+    help = "Exports recipes and related data as NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default="-",
+            help='Path of the file, "-" for standard output',
+        )
+        parser.add_argument(
+            "--with-passwords",
+            action="store_true",
+            help="Export password hashes of users",
+        )
+
+    def handle(self, *args, **options):
+        output = options["output"]
+        stats = Counter()
+        start = time.monotonic()
+        file = (sys.stdout if output == "-"
+                else open(output, "w", encoding="utf-8"))
+        try:
+            with transaction.atomic():
+                snapshot()
+                for name, line in export_lines(options["with_passwords"]):
+                    file.write(line)
+                    stats[name] += 1
+        finally:
+            if file is not sys.stdout:
+                file.close()
+
+        elapsed = time.monotonic() - start
+        for name, count in stats.items():
+            self.stderr.write(f"{name}: {count}")
+        total = sum(stats.values())
+        self.stderr.write(
+            f"Export complete: {total} rows, "
+            f"{total / max(elapsed, 1e-6):.0f} rows/s"
+        )
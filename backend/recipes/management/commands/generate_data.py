@@ -0,0 +1,181 @@
+"""
+Custom manage-commands.
+"""
+
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+
+from recipes import cards, cart, catalogs, counters, synthetic
+from recipes.versions import (CATALOG_VERSION, INGREDIENTS_VERSION,
+                              TAGS_VERSION, USERS_VERSION, bump_version)
+from users.models import User
+
+
+def build_cards(recipe_ids, count):
+    synthetic.fast_commit()
+    with transaction.atomic():
+        cards.rebuild(recipe_ids)
+
+
+def rebuild_carts(user_ids, count):
+    synthetic.fast_commit()
+    with transaction.atomic():
+        cart.rebuild(user_ids)
+
+
+def batches(ids, size):
+    """Returns lists of batches of ids and their sizes."""
+
+    parts = [ids[start:start + size] for start in range(0, len(ids), size)]
+    return parts, [len(part) for part in parts]
+
+
+class Command(BaseCommand):
+    """
+    Generate reproducible synthetic dataset for load testing.
+
+    Rows are inserted by bulk_create in chunks of GENERATE_BATCH_SIZE in
+    a pool of forked processes, every chunk is a separate transaction.
+    Signals are not sent, so cards, counters, shopping cart totals and
+    catalogs are rebuilt after the insert. Image variants are not
+    rendered, "build_image_variants" does it. Users are named
+    "<prefix><index>" and have the same password.
+    """
+
+    help = "Generates synthetic users, recipes and their relations"
+
+    def add_arguments(self, parser):
+        for name, default in (("users", 1000), ("recipes", 10000),
+                              ("favorites", 100000), ("carts", 10000),
+                              ("subscriptions", 10000)):
+            parser.add_argument(
+                f"--{name}", type=int, default=default,
+                help=f"Number of {name} to generate",
+            )
+        parser.add_argument(
+            "--tags", type=int, default=20,
+            help="Minimal number of tags, missing ones are generated",
+        )
+        parser.add_argument(
+            "--ingredients", type=int, default=2000,
+            help="Minimal number of ingredients, missing ones are generated",
+        )
+        parser.add_argument(
+            "--images", type=int, default=20,
+            help="Number of distinct placeholder images",
+        )
+        parser.add_argument(
+            "--skew", type=float, default=1.1,
+            help="Exponent of power law of popularity",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--prefix", default="synthetic")
+        parser.add_argument("--password", default="synthetic")
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count(),
+            help="Number of processes",
+        )
+
+    def handle(self, *args, **options):
+        if options["users"] < 1:
+            raise CommandError("At least one user is needed.")
+        prefix = options["prefix"]
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(f'Users with prefix "{prefix}" exist.')
+        self.workers = options["workers"]
+        size = settings.GENERATE_BATCH_SIZE
+        seed = options["seed"]
+        start = time.monotonic()
+
+        state = synthetic.state
+        state.update(
+            seed=seed,
+            prefix=prefix,
+            skew=options["skew"],
+            now=timezone.now(),
+            password=make_password(options["password"]),
+            tag_ids=synthetic.ensure_tags(options["tags"]),
+            ingredients=synthetic.ensure_ingredients(options["ingredients"]),
+            images=synthetic.placeholder_images(options["images"], seed),
+        )
+
+        user_ids = self.run(
+            "users", synthetic.make_users,
+            *self.chunks(options["users"], size),
+        )
+        random.Random(f"{seed}:users").shuffle(user_ids)
+        state["user_ids"] = user_ids
+
+        recipe_ids = []
+        if options["recipes"]:
+            recipe_ids = self.run(
+                "recipes", synthetic.make_recipes,
+                *self.chunks(options["recipes"], size),
+            )
+            random.Random(f"{seed}:recipes").shuffle(recipe_ids)
+            state["recipe_ids"] = recipe_ids
+            self.run("cards", build_cards, *batches(
+                sorted(recipe_ids), settings.CARDS_BATCH_SIZE
+            ))
+
+        for name, (model, _, targets) in synthetic.RELATIONS.items():
+            if not options[name] or targets not in state:
+                continue
+            chunks, _, counts = self.chunks(options[name], size)
+            existing = model.objects.count()
+            self.run(name, synthetic.make_relations,
+                     [name] * len(chunks), chunks, counts)
+            print(f"{name}: {model.objects.count() - existing} created, "
+                  "repeated pairs are skipped")
+            if name == "carts":
+                self.run("cart totals", rebuild_carts, *batches(
+                    sorted(user_ids), settings.CART_BATCH_SIZE
+                ))
+
+        print("Reconciling counters...")
+        counters.reconcile(settings.COUNTERS_BATCH_SIZE)
+        catalogs.TAGS.rebuild()
+        catalogs.INGREDIENTS.rebuild()
+        for version in (CATALOG_VERSION, TAGS_VERSION, INGREDIENTS_VERSION,
+                        USERS_VERSION):
+            bump_version(version)
+        print(f"Generating complete in {time.monotonic() - start:.0f} s")
+
+    @staticmethod
+    def chunks(total, size):
+        """Returns lists of numbers, starts and sizes of chunks."""
+
+        starts = list(range(0, total, size))
+        return (list(range(len(starts))), starts,
+                [min(size, total - start) for start in starts])
+
+    def run(self, name, function, *arguments):
+        """
+        Calls function in forked processes, they inherit the state.
+        Arguments are lists, the last one is sizes of tasks. Returns
+        joined lists of results.
+        """
+
+        print(f"Generating {name}...")
+        start = time.monotonic()
+        connections.close_all()
+        results = []
+        with ProcessPoolExecutor(
+            self.workers, mp_context=multiprocessing.get_context("fork")
+        ) as executor:
+            for result in executor.map(function, *arguments):
+                results.extend(result or ())
+        elapsed = time.monotonic() - start
+        total = sum(arguments[-1])
+        print(f"{name}: {total} in {elapsed:.1f} s, "
+              f"{total / max(elapsed, 1e-6):.0f}/s")
+        return results
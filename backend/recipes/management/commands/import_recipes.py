@@ -0,0 +1,134 @@
+"""
+Custom manage-commands.
+"""
+
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files import File
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from recipes import cards, cart, catalogs, counters
+from recipes.models import Recipe
+from recipes.transfer import defer_constraints, keep_dates, read_chunks
+from recipes.versions import (CATALOG_VERSION, INGREDIENTS_VERSION,
+                              TAGS_VERSION, USERS_VERSION, bump_version)
+
+
+class Command(BaseCommand):
+    """
+    Import NDJSON made by "export_recipes".
+
+    Rows are created by bulk_create in chunks of TRANSFER_BATCH_SIZE in
+    one transaction, foreign keys are checked on commit. Signals are not
+    sent, so cards, counters, shopping cart totals and catalogs are
+    rebuilt after the import. Recipes are always created anew, importing
+    the same file twice duplicates them.
+    """
+
+    help = "Imports recipes and related data from NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "file",
+            help='Path of the file, "-" for standard input',
+        )
+        parser.add_argument(
+            "--media",
+            help="Media root of the exported site to copy images from",
+        )
+
+    def handle(self, *args, **options):
+        path = options["file"]
+        stats, durations, id_maps = Counter(), Counter(), {}
+        start = time.monotonic()
+        file = (sys.stdin if path == "-"
+                else open(path, encoding="utf-8"))
+        try:
+            with transaction.atomic(), keep_dates():
+                defer_constraints()
+                chunk_start = time.monotonic()
+                for records, rows in read_chunks(file):
+                    stats[records.name] += records.load(rows, id_maps)
+                    now = time.monotonic()
+                    durations[records.name] += now - chunk_start
+                    chunk_start = now
+                self.rebuild(id_maps)
+        finally:
+            if file is not sys.stdin:
+                file.close()
+
+        catalogs.TAGS.rebuild()
+        catalogs.INGREDIENTS.rebuild()
+        for version in (CATALOG_VERSION, TAGS_VERSION, INGREDIENTS_VERSION,
+                        USERS_VERSION):
+            bump_version(version)
+
+        recipe_ids = list(id_maps.get("recipe", {}).values())
+        if options["media"] and recipe_ids:
+            copied = self.copy_media(options["media"], recipe_ids)
+            print(f"Images copied: {copied} of {len(recipe_ids)}")
+
+        for name, count in stats.items():
+            print(f"{name}: {count} rows, "
+                  f"{count / max(durations[name], 1e-6):.0f} rows/s")
+        total = sum(stats.values())
+        elapsed = time.monotonic() - start
+        print(f"Import complete: {total} rows, "
+              f"{total / max(elapsed, 1e-6):.0f} rows/s")
+
+    @staticmethod
+    def rebuild(id_maps):
+        """Rebuilds objects maintained by signals."""
+
+        recipe_ids = list(id_maps.get("recipe", {}).values())
+        for start in range(0, len(recipe_ids), settings.CARDS_BATCH_SIZE):
+            cards.rebuild(
+                recipe_ids[start:start + settings.CARDS_BATCH_SIZE]
+            )
+        cart.rebuild(list(id_maps.get("user", {}).values()))
+        counters.reconcile(settings.COUNTERS_BATCH_SIZE)
+
+    @staticmethod
+    def copy_media(media_root, recipe_ids):
+        """
+        Copies images of recipes in parallel threads to the storage of
+        recipe images. The storage may name the file differently (by its
+        content), then recipes are updated in this thread.
+        """
+
+        storage = Recipe._meta.get_field("image").storage
+
+        def copy(name):
+            source = os.path.join(media_root, name)
+            if not name or not os.path.isfile(source):
+                return None
+            if storage.exists(name):
+                return name
+            with open(source, "rb") as image:
+                return storage.save(name, File(image))
+
+        def image_names():
+            size = settings.TRANSFER_BATCH_SIZE
+            for start in range(0, len(recipe_ids), size):
+                yield from Recipe.objects.filter(
+                    id__in=recipe_ids[start:start + size]
+                ).exclude(image="").values_list("image", flat=True)
+
+        copied = 0
+        with ThreadPoolExecutor(settings.TRANSFER_MEDIA_WORKERS) as executor:
+            names = list(image_names())
+            for name, saved in zip(names, executor.map(copy, names)):
+                if saved is None:
+                    continue
+                copied += 1
+                if saved != name:
+                    Recipe.objects.filter(
+                        id__in=recipe_ids, image=name
+                    ).update(image=saved)
+        return copied
@@ -3,40 +3,177 @@ Custom manage-commands.
 """
 
 import csv
+import io
+import json
+import os
 
 from django.conf import settings
 from django.core.management import BaseCommand
+from django.db import connection, transaction
 
-from recipes.models import Ingredient, Tag
+from recipes import cards, catalogs
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.versions import (CATALOG_VERSION, INGREDIENTS_VERSION,
+                              TAGS_VERSION, bump_version)
 
-MODELS_FILES = {
-    Ingredient: 'ingredients.csv',
-    Tag: 'tags.csv',
+
+def normalize(value):
+    return " ".join(str(value).split()).lower()
+
+
+def read_rows(path):
+    """Reads list of dicts from .json file or from .csv file with header."""
+
+    with open(path, encoding="utf-8") as file:
+        if os.path.splitext(path)[1].lower() == ".json":
+            return json.load(file)
+        return list(csv.DictReader(file))
+
+
+def copy_rows(model, fields, objects):
+    """Inserts objects by COPY, falls back to batched bulk_create."""
+
+    if not objects:
+        return
+    with connection.cursor() as cursor:
+        copy = getattr(cursor.cursor, "copy_expert", None)
+        if connection.vendor != "postgresql" or copy is None:
+            model.objects.bulk_create(
+                objects, batch_size=settings.LOAD_DATA_BATCH_SIZE
+            )
+            return
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for obj in objects:
+            writer.writerow(getattr(obj, field) for field in fields)
+        buffer.seek(0)
+        columns = ", ".join(
+            connection.ops.quote_name(model._meta.get_field(field).column)
+            for field in fields
+        )
+        table = connection.ops.quote_name(model._meta.db_table)
+        copy(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+class CatalogLoader:
+    """
+    Diffs rows of the file against the table by normalized key.
+
+    New rows are inserted, rows that differ from the file are updated,
+    rows missing in the file are kept, recipes may use them.
+    """
+
+    def __init__(self, model, fields, key_fields, card_lookup):
+        self.model = model
+        self.fields = fields
+        self.key_fields = key_fields
+        self.card_lookup = card_lookup
+
+    def key(self, values):
+        return tuple(normalize(values[field]) for field in self.key_fields)
+
+    def diff(self, rows):
+        """Returns lists of new and changed objects."""
+
+        existing = {}
+        for obj in self.model.objects.order_by("id").iterator(
+            chunk_size=settings.LOAD_DATA_BATCH_SIZE
+        ):
+            existing.setdefault(
+                self.key({field: getattr(obj, field)
+                          for field in self.key_fields}),
+                obj,
+            )
+        new, changed = {}, {}
+        for row in rows:
+            values = {field: str(row[field]).strip() for field in self.fields}
+            key = self.key(values)
+            obj = existing.get(key)
+            if obj is None:
+                new.setdefault(key, self.model(**values))
+            elif any(getattr(obj, field) != values[field]
+                     for field in self.fields):
+                for field, value in values.items():
+                    setattr(obj, field, value)
+                changed[obj.id] = obj
+        return list(new.values()), list(changed.values())
+
+    def save(self, new, changed):
+        """Writes the diff, returns ids of recipes showing changed rows."""
+
+        copy_rows(self.model, self.fields, new)
+        self.model.objects.bulk_update(
+            changed, self.fields, batch_size=settings.LOAD_DATA_BATCH_SIZE
+        )
+        return Recipe.objects.filter(
+            **{f"{self.card_lookup}__in": changed}
+        ).values_list("id", flat=True).distinct()
+
+
+LOADERS = {
+    "ingredients": (
+        CatalogLoader(Ingredient, ("name", "measurement_unit"),
+                      ("name", "measurement_unit"), "ingredients"),
+        catalogs.INGREDIENTS,
+        INGREDIENTS_VERSION,
+    ),
+    "tags": (
+        CatalogLoader(Tag, ("name", "color", "slug"), ("slug",), "tags"),
+        catalogs.TAGS,
+        TAGS_VERSION,
+    ),
 }
 
 
 class Command(BaseCommand):
-    '''
-    Load data from csv into DB.
-    Raise ALREDY_LOADED_ERROR_MESSAGE if data exists in DB.
-    '''
+    """
+    Load tags and ingredients from .csv or .json files into DB.
 
-    help = settings.HELP_MESSAGE
+    Can be run on a filled database: only new and changed rows are
+    written. Ingredients are matched by normalized name and measurement
+    unit, tags by slug.
+    """
 
-    def handle(self, *args, **options):
+    help = settings.HELP_MESSAGE
 
-        if Ingredient.objects.exists() or Tag.objects.exists():
-            print(settings.ALREDY_LOADED_ERROR_MESSAGE)
-            return
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ingredients",
+            default=os.path.join(settings.DIRECTION_OF_FILES,
+                                 "ingredients.csv"),
+            help="Path of .csv or .json file with ingredients",
+        )
+        parser.add_argument(
+            "--tags",
+            default=os.path.join(settings.DIRECTION_OF_FILES, "tags.csv"),
+            help="Path of .csv or .json file with tags",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Show the changes without writing them",
+        )
 
+    def handle(self, *args, **options):
         print("Loading data...")
 
-        for model, file in MODELS_FILES.items():
-            with open(
-                    f'{settings.DIRECTION_OF_FILES}/{file}',
-                    'r', encoding='utf-8',
-            ) as table:
-                reader = csv.DictReader(table)
-                model.objects.bulk_create(model(**data) for data in reader)
+        changed_versions = []
+        with transaction.atomic():
+            for name, (loader, catalog, version) in LOADERS.items():
+                new, changed = loader.diff(read_rows(options[name]))
+                print(f"{name}: {len(new)} new, {len(changed)} changed")
+                if options["dry_run"] or not (new or changed):
+                    continue
+                recipe_ids = list(loader.save(new, changed))
+                cards.rebuild(recipe_ids)
+                transaction.on_commit(catalog.rebuild)
+                changed_versions.append(version)
+
+        if changed_versions:
+            for version in (CATALOG_VERSION, *changed_versions):
+                bump_version(version)
 
-        print("Loading data complete")
+        if options["dry_run"]:
+            print("Dry run, nothing is written")
+        else:
+            print("Loading data complete")
@@ -0,0 +1,30 @@
+"""
+Custom manage-commands.
+"""
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from recipes.counters import reconcile
+
+
+class Command(BaseCommand):
+    """
+    Recompute denormalized counters of recipes and users.
+    Only counters that differ from the actual numbers are updated.
+    """
+
+    help = "Fixes drifted counters of recipes and users"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.COUNTERS_BATCH_SIZE,
+            help="Number of objects updated by one query",
+        )
+
+    def handle(self, *args, **options):
+        print("Reconciling counters...")
+        fixed = reconcile(options["batch_size"])
+        print(f"Reconciling counters complete: {fixed}")
@@ -0,0 +1,20 @@
+# Generated by Django 4.2 on 2026-10-17 04:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="card",
+            field=models.JSONField(
+                blank=True, default=dict, editable=False, verbose_name="card"
+            ),
+        ),
+    ]
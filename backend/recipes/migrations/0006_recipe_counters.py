@@ -0,0 +1,54 @@
+# Generated by Django 4.2 on 2026-10-17 04:32
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ("recipes", "Recipe", "favorites_count", "recipes", "Favorite", "recipe"),
+    ("recipes", "Recipe", "in_carts_count",
+     "recipes", "ShoppingCart", "recipe"),
+    ("users", "User", "recipes_count", "recipes", "Recipe", "author"),
+    ("users", "User", "followers_count", "users", "Subscription", "author"),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for app, model, field, counted_app, counted, fk in COUNTERS:
+        Model = apps.get_model(app, model)
+        Counted = apps.get_model(counted_app, counted)
+        count = (
+            Counted.objects.filter(**{fk: models.OuterRef("pk")})
+            .order_by()
+            .values(fk)
+            .annotate(count=models.Count("pk"))
+            .values("count")
+        )
+        Model.objects.update(
+            **{field: Coalesce(models.Subquery(count), 0)}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0005_shoppingcartingredient"),
+        ("users", "0002_user_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="favorites_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="favorites count"
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="in_carts_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="in shopping carts count"
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
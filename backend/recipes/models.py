@@ -5,9 +5,14 @@ wish-lists and favorites.
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
+from recipes.storage import recipe_images
+from users.models import CountersMixin
+
 User = get_user_model()
 
 
@@ -98,7 +103,7 @@ class Ingredient(models.Model):
         return f"{self.name}, {self.measurement_unit}"
 
 
-class Recipe(models.Model):
+class Recipe(CountersMixin, models.Model):
     """
     Recipes model.
 
@@ -107,10 +112,26 @@ class Recipe(models.Model):
 
     "name" have max length set in the settings by constant NAME_MAX_LENG.
 
-    "image" is used to upload images in /media/recipes/.
+    "image" is used to upload images in /media/recipes/. Files are named
+    by hash of content, the same image is stored once.
 
     "pub_date" is the time of publication. It set automatically.
 
+    "card" is pre-rendered part of the recipe representation that is the
+    same for all users. It is rebuilt on every change of the recipe.
+
+    "image_variants" are names of resized copies of "image" and its tiny
+    placeholder, they are rendered in background after saving of image.
+
+    "search_vector" is full-text vector of name, text and ingredients.
+    It is rebuilt together with "card".
+
+    "favorites_count" and "in_carts_count" are denormalized counters of
+    users that have the recipe in favorites and in shopping cart.
+
+    "version" is incremented by every update through API, an update with
+    outdated version is rejected.
+
     Used ordering by "-pub_date" field.
     """
 
@@ -139,6 +160,7 @@ class Recipe(models.Model):
     image = models.ImageField(
         verbose_name="image",
         upload_to="recipes/",
+        storage=recipe_images,
     )
     text = models.TextField(
         verbose_name="text",
@@ -157,11 +179,49 @@ class Recipe(models.Model):
         auto_now_add=True,
         editable=False,
     )
+    image_variants = models.JSONField(
+        verbose_name="image variants",
+        default=dict,
+        blank=True,
+        editable=False,
+    )
+    card = models.JSONField(
+        verbose_name="card",
+        default=dict,
+        blank=True,
+        editable=False,
+    )
+    search_vector = SearchVectorField(
+        verbose_name="search vector",
+        null=True,
+        editable=False,
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name="favorites count",
+        default=0,
+        editable=False,
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name="in shopping carts count",
+        default=0,
+        editable=False,
+    )
+
+    version = models.PositiveIntegerField(
+        verbose_name="version",
+        default=1,
+        editable=False,
+    )
+
+    counter_fields = ("favorites_count", "in_carts_count", "version")
 
     class Meta:
         verbose_name = "Recipe"
         verbose_name_plural = "Recipes"
         ordering = ("-pub_date",)
+        indexes = (
+            GinIndex(fields=("search_vector",), name="recipe_search_idx"),
+        )
 
     def __str__(self):
         return f"{self.name}. Author: {self.author.username}"
@@ -308,3 +368,46 @@ class Favorite(models.Model):
 
     def __str__(self):
         return f"{self.user} added {self.recipe}"
+
+
+class ShoppingCartIngredient(models.Model):
+    """
+    Total amounts of ingredients in shopping cart of user.
+
+    Fields: user, ingredient, amount.
+
+    The pair "user" and "ingredient" must be unique.
+
+    Table is updated in the same transaction with shopping cart and recipes
+    in it (see cart.py), so shopping list is read without aggregation.
+    """
+
+    user = models.ForeignKey(
+        User,
+        verbose_name="user",
+        related_name="shopping_cart_ingredients",
+        on_delete=models.CASCADE,
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        verbose_name="ingredient",
+        related_name="+",
+        on_delete=models.CASCADE,
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name="amount",
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = "Ingredient in shopping cart"
+        verbose_name_plural = "Ingredients in shopping cart"
+        constraints = (
+            models.UniqueConstraint(
+                fields=("user", "ingredient"),
+                name="unique ingredient in shopping cart"
+            ),
+        )
+
+    def __str__(self):
+        return f"{self.user}: {self.ingredient}, {self.amount}"
@@ -0,0 +1,92 @@
+"""
+Pagination of large tables, shared by the admin and the API.
+"""
+
+import json
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+
+
+class EstimatedPage(Page):
+    """Page that knows whether the next one exists by its own rows."""
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that takes the number of objects from the query planner.
+
+    Works only on PostgreSQL. Exact COUNT(*) is still used for small
+    result sets (less than ESTIMATED_COUNT_THRESHOLD rows) and for other
+    databases. The estimate is only shown as "count": it may be lower
+    than the real number, so pages are validated by their rows, one
+    extra row tells whether the next page exists.
+    """
+
+    @cached_property
+    def estimated_count(self):
+        """Planner estimate of a large result set, None if not used."""
+
+        queryset = self.object_list
+        if (hasattr(queryset, "query")
+                and connections[queryset.db].vendor == "postgresql"):
+            estimate = self.estimate(queryset)
+            if estimate >= settings.ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return None
+
+    @cached_property
+    def count(self):
+        if self.estimated_count is not None:
+            return self.estimated_count
+        return super().count
+
+    def validate_number(self, number):
+        if self.estimated_count is None:
+            return super().validate_number(number)
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_("That page number is not an integer"))
+        if number < 1:
+            raise EmptyPage(_("That page number is less than 1"))
+        return number
+
+    def page(self, number):
+        if self.estimated_count is None:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(_("That page contains no results"))
+        has_next = len(rows) > self.per_page
+        # The real number is known on the last page and is at least
+        # the number of rows seen on the others.
+        seen = bottom + len(rows)
+        self.count = max(self.count, seen) if has_next else seen
+        return EstimatedPage(rows[:self.per_page], number, self, has_next)
+
+    @staticmethod
+    def estimate(queryset):
+        """Returns number of rows expected by the query planner."""
+
+        sql, params = queryset.query.sql_with_params()
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
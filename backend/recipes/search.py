@@ -0,0 +1,62 @@
+"""
+Full-text search of recipes.
+
+Search vector is stored in "search_vector" field of recipe and contains
+name (weight A), text (weight B) and names of ingredients (weight C).
+It is rebuilt on write, so search never builds it at query time.
+
+Full-text search works only on PostgreSQL, other databases (e.g. SQLite
+for development) search by substring of name.
+"""
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection
+from django.db.models import F, OuterRef, Subquery, TextField, Value
+from django.db.models.functions import Coalesce
+
+from recipes import models
+
+
+def update_search_vectors(recipe_ids):
+    """Rebuilds search vectors of recipes."""
+
+    if connection.vendor != "postgresql":
+        return
+    ingredient_names = models.RecipeIngredient.objects.filter(
+        recipe=OuterRef("pk")
+    ).order_by().values("recipe").annotate(
+        names=StringAgg("ingredient__name", " ")
+    ).values("names")
+    models.Recipe.objects.filter(id__in=recipe_ids).update(
+        search_vector=(
+            SearchVector("name", weight="A", config=settings.SEARCH_CONFIG)
+            + SearchVector("text", weight="B", config=settings.SEARCH_CONFIG)
+            + SearchVector(
+                Coalesce(
+                    Subquery(ingredient_names),
+                    Value(""),
+                    output_field=TextField(),
+                ),
+                weight="C",
+                config=settings.SEARCH_CONFIG,
+            )
+        )
+    )
+
+
+def search(queryset, text):
+    """Returns recipes that match text, the most relevant go first."""
+
+    if connection.vendor != "postgresql":
+        return queryset.filter(name__icontains=text).order_by(
+            "-pub_date", "-id"
+        )
+    query = SearchQuery(
+        text, config=settings.SEARCH_CONFIG, search_type="websearch"
+    )
+    return queryset.filter(search_vector=query).annotate(
+        rank=SearchRank(F("search_vector"), query)
+    ).order_by("-rank", "-pub_date", "-id")
@@ -0,0 +1,158 @@
+"""
+Signal receivers of recipes app.
+"""
+
+from functools import partial
+
+from django.core.signals import request_finished
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from recipes import cart, catalogs, counters, images, models
+from recipes.versions import (CATALOG_VERSION, INGREDIENTS_VERSION,
+                              TAGS_VERSION, USERS_VERSION, bump_version,
+                              user_version)
+from users.models import Subscription, User
+
+MODEL_VERSIONS = {
+    models.Recipe: (CATALOG_VERSION,),
+    models.RecipeIngredient: (CATALOG_VERSION,),
+    models.Ingredient: (CATALOG_VERSION, INGREDIENTS_VERSION),
+    models.Tag: (CATALOG_VERSION, TAGS_VERSION),
+    User: (CATALOG_VERSION, USERS_VERSION),
+}
+MODEL_CATALOGS = {
+    models.Tag: catalogs.TAGS,
+    models.Ingredient: catalogs.INGREDIENTS,
+}
+USER_LIST_MODELS = (
+    models.Favorite,
+    models.ShoppingCart,
+    Subscription,
+)
+
+
+def bump_versions(*names):
+    """Bumps versions when the transaction is committed."""
+
+    for name in names:
+        transaction.on_commit(partial(bump_version, name))
+
+
+def model_changed(sender, update_fields=None, **kwargs):
+    """Logins of users do not change shown data."""
+
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    bump_versions(*MODEL_VERSIONS[sender])
+
+
+def catalog_changed(sender, **kwargs):
+    """Rebuilds catalog once when the transaction is committed."""
+
+    MODEL_CATALOGS[sender].schedule()
+
+
+def user_list_changed(sender, instance, **kwargs):
+    """Favorites, shopping cart and subscriptions of user are changed."""
+
+    bump_versions(user_version(instance.user_id))
+
+
+def counted_created(sender, instance, created, **kwargs):
+    """Counters of referenced objects are changed in the same transaction."""
+
+    if created:
+        for model, field, counted, fk in counters.COUNTERS:
+            if counted is sender:
+                counters.change(model, field, getattr(instance, fk + "_id"), 1)
+
+
+def counted_deleted(sender, instance, **kwargs):
+    for model, field, counted, fk in counters.COUNTERS:
+        if counted is sender:
+            counters.change(model, field, getattr(instance, fk + "_id"), -1)
+
+
+request_finished.connect(images.save_finished)
+
+for model in MODEL_VERSIONS:
+    post_save.connect(model_changed, sender=model)
+    post_delete.connect(model_changed, sender=model)
+
+for model in MODEL_CATALOGS:
+    post_save.connect(catalog_changed, sender=model)
+    post_delete.connect(catalog_changed, sender=model)
+
+for model in USER_LIST_MODELS:
+    post_save.connect(user_list_changed, sender=model)
+    post_delete.connect(user_list_changed, sender=model)
+
+for model in {counted for _, _, counted, _ in counters.COUNTERS}:
+    post_save.connect(counted_created, sender=model)
+    post_delete.connect(counted_deleted, sender=model)
+
+
+@receiver(m2m_changed, sender=models.Recipe.tags.through)
+def recipe_tags_changed(sender, action, **kwargs):
+    if action.startswith("post_"):
+        bump_versions(CATALOG_VERSION)
+
+
+@receiver(post_save, sender=models.ShoppingCart)
+def recipe_added_to_cart(sender, instance, created, **kwargs):
+    if created:
+        cart.add_recipe(instance.recipe_id, [instance.user_id])
+
+
+@receiver(pre_delete, sender=models.ShoppingCart)
+def recipe_removed_from_cart(sender, instance, **kwargs):
+    """Ingredients of recipe still exist even if recipe is deleted."""
+
+    cart.remove_recipe(instance.recipe_id, [instance.user_id])
+
+
+@receiver(pre_save, sender=models.Recipe)
+def recipe_changing(sender, instance, update_fields=None, **kwargs):
+    """
+    Moves recipe between counters of authors, remembers the stored image.
+    Name of new image is known only after saving.
+    """
+
+    instance._stored_image = None
+    if instance._state.adding:
+        return
+    if update_fields is not None and not {"author", "image"} & set(
+        update_fields
+    ):
+        instance._stored_image = instance.image.name
+        return
+    stored = sender.objects.filter(pk=instance.pk).values(
+        "author", "image"
+    ).first()
+    if stored is None:
+        return
+    if stored["author"] != instance.author_id:
+        counters.change(User, "recipes_count", stored["author"], -1)
+        counters.change(User, "recipes_count", instance.author_id, 1)
+    instance._stored_image = stored["image"]
+
+
+@receiver(post_save, sender=models.Recipe)
+def recipe_saved(sender, instance, created, **kwargs):
+    """
+    Variants of replaced image are dropped, variants of new image are
+    rendered after the commit.
+    """
+
+    if instance.image.name == getattr(instance, "_stored_image", None):
+        return
+    if not created and instance.image_variants:
+        instance.image_variants = {}
+        sender.objects.filter(pk=instance.pk).update(image_variants={})
+    if instance.image:
+        transaction.on_commit(
+            partial(images.schedule, instance.id, instance.image.name)
+        )
@@ -0,0 +1,51 @@
+"""
+Content-addressed storage of recipe images.
+"""
+
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Names files by SHA-256 of their content: "<dir>/<ab>/<sha256><ext>".
+
+    Saving of the same content returns the name of the existing file, so
+    repeated uploads do not create copies. Files are never changed after
+    saving and can be cached forever. Unreferenced files are removed by
+    "collect_images" command, it keeps recent files, so the existing
+    file is touched on saving: it may be unreferenced until the commit.
+    """
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, digest[:2], digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            try:
+                os.utime(self.path(name))
+            except FileNotFoundError:
+                # Collected right now, save it again.
+                return super().save(name, content, max_length)
+            return name
+        return super().save(name, content, max_length)
+
+
+recipe_images = ContentAddressedStorage()
@@ -0,0 +1,258 @@
+"""
+Synthetic data for load testing.
+
+Rows are generated in chunks, every chunk has its own random generator
+seeded by the seed of the dataset, name of the phase and number of the
+chunk, so the same seed gives the same dataset regardless of the number
+of worker processes. Objects are referred to by index, indexes are
+mapped to primary keys by lists of ids collected in the previous phase.
+
+Popularity of authors, recipes, ingredients and tags follows a power
+law: object with rank k is picked with probability ~ 1 / k ** skew.
+"""
+
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from PIL import Image, ImageDraw
+
+from recipes import models
+from recipes.imaging import encode
+from recipes.storage import recipe_images
+from recipes.transfer import keep_dates
+from users.models import Subscription, User
+
+WORDS = (
+    "fresh", "spicy", "sweet", "crispy", "baked", "grilled", "creamy",
+    "smoked", "roasted", "light", "homemade", "quick", "rustic", "summer",
+)
+PERIOD = timedelta(days=365)
+
+# Shared with worker processes by fork, set by the command before the
+# pool of phase is started.
+state = {}
+
+
+def power_index(rng, size, skew):
+    """Index in range(size), small indexes are picked more often."""
+
+    if size <= 1:
+        return 0
+    power = 1 - skew
+    if power == 0:
+        return min(int((size + 1) ** rng.random()) - 1, size - 1)
+    value = (((size + 1) ** power - 1) * rng.random() + 1) ** (1 / power)
+    return min(int(value) - 1, size - 1)
+
+
+def chunk_random(phase, chunk):
+    return random.Random(f"{state['seed']}:{phase}:{chunk}")
+
+
+def past(rng):
+    return state["now"] - PERIOD * rng.random()
+
+
+def fast_commit():
+    """Commits of generated data do not wait for WAL flush."""
+
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SET synchronous_commit TO OFF")
+
+
+def placeholder_images(count, seed):
+    """Stores distinct JPEG images, returns their names."""
+
+    rng = random.Random(f"{seed}:images")
+    names = []
+    for _ in range(count):
+        image = Image.new("RGB", (800, 600), tuple(
+            rng.randrange(256) for _ in range(3)
+        ))
+        draw = ImageDraw.Draw(image)
+        for _ in range(8):
+            x, y = rng.randrange(800), rng.randrange(600)
+            radius = rng.randrange(30, 200)
+            draw.ellipse(
+                (x - radius, y - radius, x + radius, y + radius),
+                fill=tuple(rng.randrange(256) for _ in range(3)),
+            )
+        names.append(recipe_images.save(
+            "recipes/placeholder.jpg",
+            ContentFile(encode(image, "jpeg", settings.IMAGE_QUALITY)),
+        ))
+    return names
+
+
+def ensure_tags(count):
+    """Creates synthetic tags up to count, returns ids of all tags."""
+
+    existing = models.Tag.objects.count()
+    models.Tag.objects.bulk_create(
+        models.Tag(
+            name=f"Tag {number}",
+            color=f"#{number * 2654435761 % 0xFFFFFF:06X}",
+            slug=f"tag-{number}",
+        )
+        for number in range(existing, count)
+    )
+    return list(models.Tag.objects.order_by("id").values_list(
+        "id", flat=True
+    ))
+
+
+def ensure_ingredients(count):
+    """
+    Creates synthetic ingredients up to count, returns (id, name) of all
+    ingredients.
+    """
+
+    existing = models.Ingredient.objects.count()
+    models.Ingredient.objects.bulk_create(
+        (
+            models.Ingredient(
+                name=f"ingredient {number}", measurement_unit="г"
+            )
+            for number in range(existing, count)
+        ),
+        batch_size=settings.GENERATE_BATCH_SIZE,
+    )
+    return list(models.Ingredient.objects.order_by("id").values_list(
+        "id", "name"
+    ))
+
+
+def make_users(chunk, start, count):
+    """Creates users with indexes [start, start + count), returns ids."""
+
+    fast_commit()
+    rng = chunk_random("users", chunk)
+    prefix = state["prefix"]
+    users = [
+        User(
+            username=f"{prefix}{index}",
+            email=f"{prefix}{index}@example.com",
+            first_name=rng.choice(WORDS).title(),
+            last_name=f"{prefix.title()}{index}",
+            password=state["password"],
+            date_joined=past(rng),
+        )
+        for index in range(start, start + count)
+    ]
+    with transaction.atomic():
+        User.objects.bulk_create(
+            users, batch_size=settings.GENERATE_BATCH_SIZE
+        )
+    return [user.id for user in users]
+
+
+def make_recipes(chunk, start, count):
+    """
+    Creates recipes with indexes [start, start + count) with their tags
+    and ingredients, returns ids.
+    """
+
+    fast_commit()
+    rng = chunk_random("recipes", chunk)
+    user_ids, skew = state["user_ids"], state["skew"]
+    ingredients, tag_ids = state["ingredients"], state["tag_ids"]
+    recipes, recipe_tags, recipe_ingredients = [], [], []
+    for index in range(start, start + count):
+        size = min(max(int(rng.gauss(9, 3)), 1), 25, len(ingredients))
+        picked = {}
+        while len(picked) < size:
+            ingredient_id, name = ingredients[
+                power_index(rng, len(ingredients), 0.8)
+            ]
+            picked[ingredient_id] = name
+        names = list(picked.values())
+        recipes.append(models.Recipe(
+            author_id=user_ids[power_index(rng, len(user_ids), skew)],
+            name=f"{rng.choice(WORDS).title()} {names[0]} {index}"[
+                :settings.NAME_MAX_LENG
+            ],
+            text=". ".join(
+                f"Add {name}, {rng.choice(WORDS)}" for name in names
+            )[:settings.TEXT_MAX_LENG],
+            image=rng.choice(state["images"]),
+            cooking_time=rng.randint(
+                settings.COOKING_TIME_MIN, settings.COOKING_TIME_MAX // 2
+            ),
+            pub_date=past(rng),
+        ))
+        recipe_ingredients.append({
+            ingredient_id: rng.randint(1, 50) * 10
+            for ingredient_id in picked
+        })
+        recipe_tags.append({
+            tag_ids[power_index(rng, len(tag_ids), skew)]
+            for _ in range(rng.randint(1, 3))
+        })
+    with transaction.atomic(), keep_dates():
+        models.Recipe.objects.bulk_create(
+            recipes, batch_size=settings.GENERATE_BATCH_SIZE
+        )
+        models.Recipe.tags.through.objects.bulk_create(
+            (
+                models.Recipe.tags.through(recipe_id=recipe.id, tag_id=tag_id)
+                for recipe, tags in zip(recipes, recipe_tags)
+                for tag_id in tags
+            ),
+            batch_size=settings.GENERATE_BATCH_SIZE,
+        )
+        models.RecipeIngredient.objects.bulk_create(
+            (
+                models.RecipeIngredient(
+                    recipe_id=recipe.id,
+                    ingredient_id=ingredient_id,
+                    amount=amount,
+                )
+                for recipe, amounts in zip(recipes, recipe_ingredients)
+                for ingredient_id, amount in amounts.items()
+            ),
+            batch_size=settings.GENERATE_BATCH_SIZE,
+        )
+    return [recipe.id for recipe in recipes]
+
+
+# name: (model, target field, ids of targets in state)
+RELATIONS = {
+    "favorites": (models.Favorite, "recipe", "recipe_ids"),
+    "carts": (models.ShoppingCart, "recipe", "recipe_ids"),
+    "subscriptions": (Subscription, "author", "user_ids"),
+}
+
+
+def make_relations(name, chunk, count):
+    """
+    Creates count pairs of users and recipes or authors, both sides are
+    picked by power law. Repeated pairs are skipped. Pairs are inserted
+    in sorted order, so concurrent chunks do not deadlock on popular
+    pairs.
+    """
+
+    fast_commit()
+    model, field, targets = RELATIONS[name]
+    rng = chunk_random(name, chunk)
+    user_ids, target_ids = state["user_ids"], state[targets]
+    skew = state["skew"]
+    pairs = {}
+    for _ in range(count):
+        user_id = user_ids[power_index(rng, len(user_ids), skew)]
+        target_id = target_ids[power_index(rng, len(target_ids), skew)]
+        if user_id != target_id or model is not Subscription:
+            pairs[user_id, target_id] = past(rng)
+    with transaction.atomic(), keep_dates():
+        model.objects.bulk_create(
+            (
+                model(user_id=user_id, date_added=date_added,
+                      **{f"{field}_id": target_id})
+                for (user_id, target_id), date_added in sorted(pairs.items())
+            ),
+            batch_size=settings.GENERATE_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
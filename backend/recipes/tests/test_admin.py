@@ -0,0 +1,119 @@
+"""
+Admin changelists and autocomplete of large tables.
+"""
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from recipes import models
+from users.models import User
+
+
+class RecipeAdminTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            email="admin@example.com", username="admin", password="admin",
+            first_name="Админ", last_name="Админ",
+        )
+        for number in range(10):
+            author = User.objects.create_user(
+                email=f"author{number}@example.com",
+                username=f"author{number}", password="Password123",
+                first_name="Имя", last_name="Фамилия",
+            )
+            models.Recipe.objects.create(
+                author=author, name=f"Борщ {number}", text="Свёкла",
+                image="recipes/image.png", cooking_time=10,
+            )
+
+    def autocomplete(self, term):
+        return self.client.get("/admin/autocomplete/", {
+            "app_label": "recipes",
+            "model_name": "favorite",
+            "field_name": "recipe",
+            "term": term,
+        })
+
+    def test_autocomplete_queries_do_not_grow(self):
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.autocomplete("Бор")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 10)
+        self.assertLess(len(queries), 10)
+
+    def test_partial_word_is_found(self):
+        self.client.force_login(self.admin)
+        results = self.autocomplete("орщ 3").json()["results"]
+        self.assertEqual(
+            [result["text"] for result in results],
+            ["Борщ 3. Author: author3"],
+        )
+
+
+class RecipeVersionAdminTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            email="admin@example.com", username="admin", password="admin",
+            first_name="Админ", last_name="Админ",
+        )
+        cls.tag = models.Tag.objects.create(
+            name="tag", color="#0000FF", slug="tag"
+        )
+        cls.ingredient = models.Ingredient.objects.create(
+            name="соль", measurement_unit="г"
+        )
+        cls.recipe = models.Recipe.objects.create(
+            author=cls.admin, name="Борщ", text="Свёкла",
+            image="recipes/image.png", cooking_time=10,
+        )
+        cls.recipe.tags.set([cls.tag])
+        cls.row = models.RecipeIngredient.objects.create(
+            recipe=cls.recipe, ingredient=cls.ingredient, amount=100
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def stored_version(self):
+        return models.Recipe.objects.get(id=self.recipe.id).version
+
+    def test_recipe_change_increments_version(self):
+        prefix = "recipe_ingredient"
+        response = self.client.post(
+            f"/admin/recipes/recipe/{self.recipe.id}/change/",
+            {
+                "name": "Борщ красный",
+                "author": self.admin.id,
+                "text": "Свёкла",
+                "tags": [self.tag.id],
+                "cooking_time": 10,
+                f"{prefix}-TOTAL_FORMS": 1,
+                f"{prefix}-INITIAL_FORMS": 1,
+                f"{prefix}-MIN_NUM_FORMS": 1,
+                f"{prefix}-MAX_NUM_FORMS": 1000,
+                f"{prefix}-0-id": self.row.id,
+                f"{prefix}-0-recipe": self.recipe.id,
+                f"{prefix}-0-ingredient": self.ingredient.id,
+                f"{prefix}-0-amount": 150,
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.stored_version(), 2)
+
+    def test_ingredient_row_change_increments_version(self):
+        response = self.client.post(
+            f"/admin/recipes/recipeingredient/{self.row.id}/change/",
+            {
+                "recipe": self.recipe.id,
+                "ingredient": self.ingredient.id,
+                "amount": 150,
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.stored_version(), 2)
@@ -0,0 +1,81 @@
+"""
+Export and import of recipes.
+"""
+
+import io
+import json
+import os
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+
+from recipes import models
+from users.models import User
+
+
+@override_settings(IMAGE_WORKERS=0)
+class TransferTests(TransactionTestCase):
+    """Export runs in its own snapshot transaction."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            email="author@example.com", username="author",
+            password="Password123", first_name="Имя", last_name="Фамилия",
+        )
+        self.recipe = models.Recipe.objects.create(
+            author=self.author, name="Борщ", text="Свёкла",
+            image="recipes/image.png", cooking_time=10,
+        )
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+
+    def export(self, *args):
+        path = os.path.join(self.temp_dir, "export.ndjson")
+        call_command(
+            "export_recipes", "--output", path, *args, stderr=io.StringIO()
+        )
+        with open(path, encoding="utf-8") as file:
+            return [json.loads(line) for line in file]
+
+    def import_file(self, rows, *args):
+        path = os.path.join(self.temp_dir, "export.ndjson")
+        with open(path, "w", encoding="utf-8") as file:
+            file.writelines(
+                json.dumps(row, ensure_ascii=False) + "\n" for row in rows
+            )
+        with override_settings(CATALOGS_ROOT=self.temp_dir):
+            with redirect_stdout(io.StringIO()):
+                call_command("import_recipes", path, *args)
+
+    def users(self, rows):
+        return [row for row in rows if row["model"] == "user"]
+
+    def test_passwords_are_exported_on_request(self):
+        self.assertNotIn("password", self.users(self.export())[0])
+        self.assertEqual(
+            self.users(self.export("--with-passwords"))[0]["password"],
+            self.author.password,
+        )
+
+    def test_users_without_passwords_cannot_log_in(self):
+        rows = self.export()
+        User.objects.filter(id=self.author.id).delete()
+        self.import_file(rows)
+        user = User.objects.get(email=self.author.email)
+        self.assertFalse(user.has_usable_password())
+
+    def test_images_are_saved_to_recipe_storage(self):
+        source = os.path.join(self.temp_dir, "source")
+        os.makedirs(os.path.join(source, "recipes"))
+        with open(os.path.join(source, "recipes", "image.png"), "wb") as file:
+            file.write(b"image")
+        media = os.path.join(self.temp_dir, "media")
+        with override_settings(MEDIA_ROOT=media):
+            self.import_file(self.export(), "--media", source)
+            storage = models.Recipe._meta.get_field("image").storage
+            imported = models.Recipe.objects.exclude(id=self.recipe.id).get()
+            self.assertNotEqual(imported.image.name, "recipes/image.png")
+            self.assertTrue(storage.exists(imported.image.name))
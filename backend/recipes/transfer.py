@@ -0,0 +1,231 @@
+"""
+Export and import of recipes with their users as NDJSON.
+
+Every line is an object with "model" key and values of the record.
+Records go in order of dependencies, so foreign keys of a record always
+point to records that are already imported. Primary keys of the source
+database are replaced by primary keys of the target one through id maps.
+Users, tags and ingredients that already exist in the target database
+(by email, slug, name and measurement unit) are reused.
+
+Password hashes are exported only on request (see "secret_fields"),
+imported users without them get unusable passwords and must reset them.
+"""
+
+import json
+from contextlib import contextmanager
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+
+from recipes import models
+from users.models import Subscription, User
+
+
+class Records:
+    """
+    Records of one model.
+
+    "fields" are exported values, "foreign_keys" maps foreign keys to
+    names of records they point to, "natural_key" is used to find
+    existing objects, records without it are always created.
+    "secret_fields" maps fields that are exported only on request to
+    functions that return values of missing ones.
+    """
+
+    def __init__(self, name, model, fields, foreign_keys=None,
+                 natural_key=None, ignore_conflicts=False,
+                 secret_fields=None):
+        self.name = name
+        self.model = model
+        self.fields = fields
+        self.foreign_keys = foreign_keys or {}
+        self.secret_fields = secret_fields or {}
+        self.natural_key = natural_key
+        self.ignore_conflicts = ignore_conflicts
+        self.has_id = "id" in fields
+
+    def export(self, secrets=False):
+        """Yields lines of all records, with secret fields if asked."""
+
+        fields = [
+            field for field in self.fields
+            if secrets or field not in self.secret_fields
+        ]
+        rows = self.model.objects.order_by(*fields[:1]).values(*fields)
+        for row in rows.iterator(chunk_size=settings.TRANSFER_BATCH_SIZE):
+            yield json.dumps(
+                {"model": self.name, **row},
+                cls=DjangoJSONEncoder,
+                ensure_ascii=False,
+            ) + "\n"
+
+    def key(self, values):
+        return tuple(values[field] for field in self.natural_key)
+
+    def existing(self, rows):
+        """Returns ids of existing objects by natural keys of rows."""
+
+        first = self.natural_key[0]
+        objects = self.model.objects.filter(**{
+            f"{first}__in": {row[first] for row in rows}
+        }).order_by("id").values("id", *self.natural_key)
+        existing = {}
+        for values in objects:
+            existing.setdefault(self.key(values), values["id"])
+        return existing
+
+    def build(self, row):
+        values = {}
+        for field in self.fields:
+            if field == "id":
+                continue
+            if field in self.foreign_keys:
+                values[f"{field}_id"] = row[field]
+            elif field not in row and field in self.secret_fields:
+                values[field] = self.secret_fields[field]()
+            else:
+                values[field] = row[field]
+        return self.model(**values)
+
+    def load(self, rows, id_maps):
+        """
+        Creates objects of rows, rows with lost foreign keys are skipped.
+        Returns number of rows created or found.
+        """
+
+        for row in rows:
+            for field, target in self.foreign_keys.items():
+                if row[field] is not None:
+                    row[field] = id_maps[target].get(row[field])
+        rows = [
+            row for row in rows
+            if all(row[field] is not None for field in self.foreign_keys
+                   if not self.model._meta.get_field(field).null)
+        ]
+        count = len(rows)
+        id_map = id_maps.setdefault(self.name, {})
+        if self.natural_key:
+            existing = self.existing(rows)
+            for row in rows:
+                if self.key(row) in existing:
+                    id_map[row["id"]] = existing[self.key(row)]
+            rows = [row for row in rows if row["id"] not in id_map]
+        objects = self.model.objects.bulk_create(
+            (self.build(row) for row in rows),
+            batch_size=settings.TRANSFER_BATCH_SIZE,
+            ignore_conflicts=self.ignore_conflicts,
+        )
+        if self.has_id:
+            for row, obj in zip(rows, objects):
+                id_map[row["id"]] = obj.id
+        return count
+
+
+RECORDS = (
+    Records(
+        "user", User,
+        ("id", "email", "username", "first_name", "last_name", "password",
+         "bio", "role", "is_active", "is_staff", "is_superuser",
+         "date_joined"),
+        natural_key=("email",),
+        secret_fields={"password": partial(make_password, None)},
+    ),
+    Records("tag", models.Tag, ("id", "name", "color", "slug"),
+            natural_key=("slug",)),
+    Records("ingredient", models.Ingredient,
+            ("id", "name", "measurement_unit"),
+            natural_key=("name", "measurement_unit")),
+    Records(
+        "recipe", models.Recipe,
+        ("id", "author", "name", "image", "text", "cooking_time",
+         "pub_date"),
+        foreign_keys={"author": "user"},
+    ),
+    Records("recipe_tag", models.Recipe.tags.through, ("recipe", "tag"),
+            foreign_keys={"recipe": "recipe", "tag": "tag"},
+            ignore_conflicts=True),
+    Records("recipe_ingredient", models.RecipeIngredient,
+            ("recipe", "ingredient", "amount"),
+            foreign_keys={"recipe": "recipe", "ingredient": "ingredient"}),
+    Records("favorite", models.Favorite, ("user", "recipe", "date_added"),
+            foreign_keys={"user": "user", "recipe": "recipe"},
+            ignore_conflicts=True),
+    Records("shopping_cart", models.ShoppingCart,
+            ("user", "recipe", "date_added"),
+            foreign_keys={"user": "user", "recipe": "recipe"},
+            ignore_conflicts=True),
+    Records("subscription", Subscription, ("user", "author", "date_added"),
+            foreign_keys={"user": "user", "author": "user"},
+            ignore_conflicts=True),
+)
+RECORDS_BY_NAME = {records.name: records for records in RECORDS}
+
+
+def export_lines(secrets=False):
+    """Yields (name, line) of all records in order of dependencies."""
+
+    for records in RECORDS:
+        for line in records.export(secrets):
+            yield records.name, line
+
+
+def read_chunks(lines):
+    """Yields (records, rows) chunks of consecutive rows of one model."""
+
+    records, rows = None, []
+    for line in lines:
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        current = RECORDS_BY_NAME[row.pop("model")]
+        if rows and (current is not records
+                     or len(rows) == settings.TRANSFER_BATCH_SIZE):
+            yield records, rows
+            rows = []
+        records = current
+        rows.append(row)
+    if rows:
+        yield records, rows
+
+
+@contextmanager
+def keep_dates():
+    """Imported dates are saved as is instead of the current time."""
+
+    fields = [
+        field for records in RECORDS
+        for field in records.model._meta.concrete_fields
+        if getattr(field, "auto_now_add", False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def snapshot():
+    """All records are exported from one snapshot of the database."""
+
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY"
+            )
+
+
+def defer_constraints():
+    """
+    Foreign keys are checked at the end of the transaction. Unique
+    constraints are needed to find conflicts, so they are checked as usual.
+    """
+
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL DEFERRED")
@@ -0,0 +1,119 @@
+"""
+Version stamps of recipe catalog data.
+
+Version is a number stored in the cache. It is bumped after every commit
+that changes the data, so everything cached under the old version is
+never read again and just expires. Time of the last bump is stored next
+to the version.
+
+Denormalized counters (favorites, carts, recipes and followers) change
+on every click, bumping versions for them would invalidate everything
+all the time. They have their own stamp based on time instead, cached
+data shows them at most COUNTERS_TTL seconds stale.
+
+Versions are useful only if all processes see them, so everything keyed
+or validated by versions is used only with a shared cache backend (see
+"versions_shared").
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Backends private to every process: version bumped by one worker is not
+# seen by others.
+LOCAL_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+CATALOG_VERSION = "recipes:version:catalog"
+TAGS_VERSION = "recipes:version:tags"
+INGREDIENTS_VERSION = "recipes:version:ingredients"
+USERS_VERSION = "recipes:version:users"
+
+
+def versions_shared():
+    """Whether versions are seen by all processes."""
+
+    return settings.CACHES["default"]["BACKEND"] not in LOCAL_CACHE_BACKENDS
+
+
+def user_version(user_id):
+    """Version of favorites, shopping cart and subscriptions of user."""
+
+    return f"recipes:version:user:{user_id}"
+
+
+def cart_version(user_id):
+    """Version of total amounts of ingredients in shopping cart of user."""
+
+    return f"recipes:version:cart:{user_id}"
+
+
+def auth_version(user_id):
+    """Version of user credentials: tokens, password and activity."""
+
+    return f"recipes:version:auth:{user_id}"
+
+
+def _initial():
+    """
+    Value for missing (or evicted) version.
+
+    Based on time, so it never repeats versions used before.
+    """
+
+    return time.time_ns()
+
+
+def _modified(name):
+    return f"{name}:modified"
+
+
+def get_version(name=CATALOG_VERSION):
+    """Returns current version."""
+
+    version = cache.get(name)
+    if version is None:
+        cache.add(name, _initial(), timeout=None)
+        version = cache.get(name, _initial())
+    return version
+
+
+def get_stamps(names):
+    """Returns list of (version, time of last bump) pairs."""
+
+    values = cache.get_many([*names, *map(_modified, names)])
+    stamps = []
+    for name in names:
+        version = values.get(name)
+        if version is None:
+            version = get_version(name)
+        modified = values.get(_modified(name))
+        if modified is None:
+            cache.add(_modified(name), time.time(), timeout=None)
+            modified = cache.get(_modified(name), time.time())
+        stamps.append((version, modified))
+    return stamps
+
+
+def bump_version(name=CATALOG_VERSION):
+    """Increments version."""
+
+    cache.set(_modified(name), time.time(), timeout=None)
+    try:
+        return cache.incr(name)
+    except ValueError:
+        version = _initial()
+        cache.set(name, version, timeout=None)
+        return version
+
+
+def counters_stamp():
+    """Returns (version, time of last bump) of counters."""
+
+    period = settings.COUNTERS_TTL
+    version = int(time.time() // period)
+    return version, version * period
@@ -4,29 +4,35 @@ Admin zone config users.
 
 from django.contrib import admin
 
+from recipes.admin import BaseAdmin, RecipeCardsMixin
+
 from .models import Subscription, User
 
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(RecipeCardsMixin, BaseAdmin):
     """Admin zone registration for User model."""
 
+    card_lookup = "author"
     list_display = (
         "id",
         "username",
         "first_name",
         "last_name",
         "email",
+        "recipes_count",
+        "followers_count",
         "password",
     )
     search_fields = ("username", "first_name", "last_name", "email",)
-    list_filter = ("username", "first_name", "last_name", "email",)
     list_editable = ("password",)
 
 
 @admin.register(Subscription)
-class SubscriptionAdmin(admin.ModelAdmin):
+class SubscriptionAdmin(BaseAdmin):
     """Admin zone registration for Subscription model."""
 
     list_display = ("id", "user", "author",)
-    search_fields = ("user", "author",)
+    list_select_related = ("user", "author",)
+    search_fields = ("user__username", "author__username",)
+    autocomplete_fields = ("user", "author",)
@@ -9,7 +9,26 @@ from django.db import models
 from rest_framework.exceptions import ValidationError
 
 
-class User(AbstractUser):
+class CountersMixin:
+    """
+    Saving of an existing object does not write counters, they are
+    changed only by UPDATE queries with F() expressions, so object loaded
+    before the change must not overwrite them.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(CountersMixin, AbstractUser):
     """
     User model.
 
@@ -66,6 +85,18 @@ class User(AbstractUser):
         default=Roles.USER,
         blank=True
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name="recipes count",
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name="followers count",
+        default=0,
+        editable=False,
+    )
+
+    counter_fields = ("recipes_count", "followers_count")
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ("username", "first_name", "last_name")